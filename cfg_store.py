@@ -0,0 +1,290 @@
+"""
+
+Local SQLite store of parsed configuration data. The parameter blocks
+of the general cfg-file and table cfg-files (see "pipelines_penman.py")
+are imported into one table with indexes on env_id, src_name,
+schema_name and tablename, so configs can be queried without parsing
+the csv-files and the script can be rendered for a part of them only.
+
+Import is incremental: every parameter block is keyed by the hash of
+its content, so re-importing a changed cfg-file inserts new blocks,
+deletes the missing ones and only renumbers the kept ones.
+
+The 'schema_name' of source rows is their 'src_schema', the one of
+serving rows is their 'schema_name'. Values are stored as they are in
+cfg-files (not transcribed).
+
+"""
+
+import hashlib
+import json
+import sqlite3
+import pipelines_penman as pen
+
+STORE_DDL = """
+create table if not exists cfg_source (
+    source_no integer primary key,
+    source text unique not null,
+    kind text not null,
+    headers text,
+    cfg_files_count integer
+);
+create table if not exists cfg_row (
+    source_no integer not null,
+    row_hash text not null,
+    dup_no integer not null,
+    seq integer not null,
+    mode text not null,
+    env_id text,
+    src_name text,
+    schema_name text,
+    tablename text,
+    column_name text,
+    params text not null,
+    primary key (source_no, row_hash, dup_no)
+);
+create index if not exists cfg_row_env_id on cfg_row (env_id);
+create index if not exists cfg_row_src_name on cfg_row (src_name);
+create index if not exists cfg_row_schema_name on cfg_row (schema_name);
+create index if not exists cfg_row_tablename on cfg_row (tablename);
+create index if not exists cfg_row_order on cfg_row (source_no, seq);
+"""
+
+def open_cfg_store(database: str):
+    """
+    Opens the store (creates its tables, if they are absent).
+
+    Input:
+        database: str - sqlite database path.
+    Output:
+        connection: sqlite3.Connection - connection to the store.
+
+    """
+    connection = sqlite3.connect(database)
+    connection.executescript(STORE_DDL)
+    return connection
+
+def _source_no(connection, source: str, kind: str, headers = None,
+               cfg_files_count: int = None):
+    """
+    Registers the cfg-file in the store, returns its number.
+
+    """
+    connection.execute(
+        'insert into cfg_source (source, kind) values (?, ?) '
+        'on conflict (source) do nothing',
+        (source, kind)
+    )
+    if headers is not None:
+        connection.execute(
+            'update cfg_source set headers = ?, cfg_files_count = ? '
+            'where source = ?',
+            (json.dumps(headers), cfg_files_count, source)
+        )
+    return connection.execute(
+        'select source_no from cfg_source where source = ?', (source,)
+    ).fetchone()[0]
+
+def _import_rows(connection, source_no: int, rows: list):
+    """
+    Incrementally replaces the parameter blocks of the cfg-file.
+    Returns numbers of added and deleted blocks.
+
+    """
+    stored = dict()
+    for row_hash, dup_no, seq in connection.execute(
+        'select row_hash, dup_no, seq from cfg_row where source_no = ?',
+        (source_no,)
+    ):
+        stored[(row_hash, dup_no)] = seq
+    dup_counts = dict()
+    new_rows = list()
+    moved_rows = list()
+    kept = set()
+    for seq, params in enumerate(rows):
+        content = json.dumps(params, sort_keys = True)
+        row_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        dup_no = dup_counts.get(row_hash, 0)
+        dup_counts[row_hash] = dup_no + 1
+        key = (row_hash, dup_no)
+        kept.add(key)
+        if key not in stored:
+            new_rows.append((
+                source_no, row_hash, dup_no, seq, params['mode'],
+                params.get('env_id'), params.get('src_name'),
+                params.get('src_schema', params.get('schema_name')),
+                params.get('tablename'), params.get('column_name'),
+                json.dumps(params)
+            ))
+        elif stored[key] != seq:
+            moved_rows.append((seq, source_no, row_hash, dup_no))
+    deleted_rows = [(source_no,) + key for key in stored if key not in kept]
+    connection.executemany(
+        'delete from cfg_row '
+        'where source_no = ? and row_hash = ? and dup_no = ?',
+        deleted_rows
+    )
+    connection.executemany(
+        'update cfg_row set seq = ? '
+        'where source_no = ? and row_hash = ? and dup_no = ?',
+        moved_rows
+    )
+    connection.executemany(
+        'insert into cfg_row values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        new_rows
+    )
+    connection.commit()
+    return len(new_rows), len(deleted_rows)
+
+def import_gen_cfg(connection, filepath: str, delimiter: str = ';'):
+    """
+    Imports the general cfg-file into the store.
+
+    Input:
+        connection - connection to the store;
+        filepath: str - general cfg-file path;
+        delimiter: str - default ';' - string element separator.
+    Output:
+        added: int - number of added parameter blocks;
+        deleted: int - number of deleted parameter blocks.
+
+    """
+    gen_data, tab_hdrs, cfg_files_count = pen.gen_cfg_file_preparation(
+        filepath, delimiter = delimiter)
+    source_no = _source_no(connection, filepath, 'gen', tab_hdrs,
+                           cfg_files_count)
+    return _import_rows(connection, source_no, gen_data)
+
+def store_headers(connection):
+    """
+    Returns the table parameter headers of the imported general
+    cfg-file (see 'gen_cfg_file_preparation') or None.
+
+    """
+    row = connection.execute(
+        "select headers from cfg_source where kind = 'gen' "
+        "order by source_no desc"
+    ).fetchone()
+    if row == None:
+        return
+    return json.loads(row[0])
+
+def import_tab_cfg(connection, filepath: str, headers: dict = None,
+                   delimiter: str = ';'):
+    """
+    Imports the table cfg-file into the store.
+
+    Input:
+        connection - connection to the store;
+        filepath: str - table cfg-file path;
+        headers: dict - default None - parameter headers; None - the
+            headers of the imported general cfg-file;
+        delimiter: str - default ';' - string element separator.
+    Output:
+        added: int - number of added parameter blocks;
+        deleted: int - number of deleted parameter blocks.
+
+    Raises ValueError, if the headers are not given and no general
+    cfg-file is imported.
+
+    """
+    if headers is None:
+        headers = store_headers(connection)
+    if headers is None:
+        raise ValueError('No headers for ' + filepath + ': import the '
+                         'general cfg-file first or give the headers')
+    tab_data = pen.tab_cfg_file_preparation(filepath, headers,
+                                            delimiter = delimiter)
+    source_no = _source_no(connection, filepath, 'tab')
+    return _import_rows(connection, source_no, tab_data)
+
+def query_rows(connection, kind: str = None, mode: str = None,
+               env_id: str = None, src_name: str = None,
+               schema_name: str = None, tablename: str = None):
+    """
+    Returns stored parameter blocks, which satisfy all given filters,
+    in the order of cfg-files and rows in them.
+
+    Input:
+        connection - connection to the store;
+        kind: str - default None - 'gen' or 'tab' cfg-files;
+        mode: str - default None - 'mode' of blocks;
+        env_id: str - default None - environment identifier;
+        src_name: str - default None - source-system name;
+        schema_name: str - default None - source or serving schema;
+        tablename: str - default None - table name or glob pattern
+            (e.g. 'client*').
+    Output:
+        rows: list - parameter blocks (in 'dict' type).
+
+    """
+    conditions = list()
+    values = list()
+    for column, value in [('s.kind', kind), ('r.mode', mode),
+                          ('r.env_id', env_id), ('r.src_name', src_name),
+                          ('r.schema_name', schema_name)]:
+        if value is not None:
+            conditions.append(column + ' = ?')
+            values.append(value)
+    if tablename is not None:
+        conditions.append('r.tablename glob ?')
+        values.append(tablename)
+    query = 'select r.params from cfg_row r ' \
+            'join cfg_source s on s.source_no = r.source_no'
+    if conditions:
+        query += ' where ' + ' and '.join(conditions)
+    query += " order by r.mode in ('serv_table', 'serv_col'), " \
+             "r.source_no, r.seq"
+    return [json.loads(row[0]) for row in connection.execute(query, values)]
+
+def store_gen_data(connection, env_id: str = None, src_name: str = None):
+    """
+    Returns transcribed parameter blocks of the general cfg-file (the
+    environment block first, source-systems after it), as they are
+    given by 'gen_cfg_file_preparation'.
+
+    """
+    gen_data = query_rows(connection, kind = 'gen', mode = 'env',
+                          env_id = env_id)
+    gen_data += query_rows(connection, kind = 'gen', mode = 'src_sys',
+                           env_id = env_id, src_name = src_name)
+    return [pen.rd2wrt_transcriptor(params) for params in gen_data]
+
+def store_tab_data(connection, src_name: str = None,
+                   schema_name: str = None, tablename: str = None):
+    """
+    Returns transcribed parameter blocks of table cfg-files: source
+    rows of all files first, serving rows after them. Serving rows have
+    no 'src_name', so the filter by it leaves source rows only.
+
+    """
+    tab_data = query_rows(connection, kind = 'tab', src_name = src_name,
+                          schema_name = schema_name, tablename = tablename)
+    return [pen.rd2wrt_transcriptor(params) for params in tab_data]
+
+def iter_store_script(connection, env_id: str = None, src_name: str = None,
+                      schema_name: str = None, tablename: str = None):
+    """
+    Yields the events of the script (see 'pipelines_penman.iter_script')
+    for the stored configs, which satisfy the filters.
+
+    Input:
+        connection - connection to the store;
+        env_id: str - default None - environment identifier;
+        src_name: str - default None - source-system name;
+        schema_name: str - default None - source or serving schema;
+        tablename: str - default None - table name or glob pattern.
+    Output:
+        stop_id: int - the row number, where rendering stoped.
+
+    Raises ValueError, if no stored source-systems satisfy the filters.
+
+    """
+    gen_data = store_gen_data(connection, env_id, src_name)
+    if not any(params['mode'] == 'src_sys' for params in gen_data):
+        raise ValueError('No stored source-systems match the filters: '
+                         'env_id = ' + str(env_id) + ', src_name = '
+                         + str(src_name))
+    tab_data = store_tab_data(connection, src_name, schema_name, tablename)
+    id = yield from pen.iter_script(gen_data, tab_data)
+    return id
@@ -0,0 +1,72 @@
+"""
+
+Shared cfg-file fixtures of the tests.
+
+"""
+
+import pytest
+
+GEN_CFG = """\
+2;cfg_files_count;3
+1;#comment
+1;#headers
+2;env;env_id
+4;src_sys;env_id;src_name;descript
+1;#tab headers
+1;#tab headers
+5;src_table;src_name;tablename;subsystem;src_schema
+11;src_col;src_name;src_schema;tablename;column_name;data_type;precision;scale;key_flg;batch_flg;date_prc_flg
+4;serv_table;schema_name;tablename;key_shifting_type
+8;serv_col;schema_name;tablename;column_name;data_type;precision;scale;key_flg
+1;#cfg_end
+2;env;dev
+4;src_sys;dev;crm;null
+4;src_sys;dev;erp;Enterprise
+"""
+
+TAB_CFG = """\
+1;#crm
+5;src_table;crm;client;sys;public
+5;src_table;crm;deal;sys;public
+11;src_col;crm;public;client;id;int;null;null;y;n;n
+11;src_col;crm;public;client;name;text;null;null;n;n;n
+11;src_col;crm;public;deal;id;int;null;null;y;n;n
+1;#erp
+5;src_table;erp;invoice;sys;public
+11;src_col;erp;public;invoice;num;text;null;null;y;n;n
+1;#serving
+4;serv_table;dds_lgc;client;LOCAL
+4;serv_table;dds_lnk;client_deal;GLOBAL
+8;serv_col;dds_lgc;client;id;int;null;null;y
+8;serv_col;dds_lnk;client_deal;client_id;int;null;null;n
+"""
+
+TAB_CFG_2 = """\
+5;src_table;erp;payment;sys;public
+11;src_col;erp;public;payment;amount;numeric;null;null;n;n;n
+4;serv_table;dds;payment;NONE
+4;serv_table;bad_schema;payment;LOCAL
+8;serv_col;dds;payment;amount;numeric;null;null;n
+"""
+
+@pytest.fixture
+def write_cfg(tmp_path):
+    """
+    Writes the cfg-file text to the temporary directory, returns its
+    path.
+
+    """
+    def write(name: str, text: str):
+        filepath = tmp_path / name
+        filepath.write_text(text)
+        return str(filepath)
+    return write
+
+@pytest.fixture
+def cfg_files(write_cfg):
+    """
+    Paths of the general cfg-file and the two table cfg-files.
+
+    """
+    return (write_cfg('gen.csv', GEN_CFG), write_cfg('tab_1.csv', TAB_CFG),
+            write_cfg('tab_2.csv', TAB_CFG_2))
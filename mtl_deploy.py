@@ -0,0 +1,167 @@
+"""
+
+Checkpointed, resumable execution of generated scripts. The script is
+rendered in the checkpointed layout (see
+"pipelines_penman.iter_checkpointed_script"): logical units (a
+source-system, a table with its columns) are between checkpoint
+markers with stable identifiers. The units are executed one by one
+through a DB-API connection; each one is written down to the journal
+table of the target database in the same transaction as its commands,
+so a committed unit is always in the journal. A restarted run skips
+the units, which are in the journal, and resumes at the failed one; commands outside units (setting the
+environment, preparing statements) are executed every time. In the
+prepared-statement output mode the statements are prepared outside the
+units (see "pipelines_penman.iter_prepared").
+
+Both ways are supported: events of the generator (the commands are
+executed as prepared statements, see "mtl_v1_3.prepared_sql") and
+script files with checkpoint markers, which are written by
+"pipelines_penman.writedown_env_scripts".
+
+"""
+
+import mtl_v1_3 as mtl
+import pipelines_penman as pen
+
+# journal table of the target database
+JOURNAL_TABLE = 'mtl_deploy_journal'
+
+def load_journal(connection, journal_table: str = JOURNAL_TABLE):
+    """
+    Creates the journal table, if it is absent, and returns the set of
+    identifiers of the completed units.
+
+    Input:
+        connection - DB-API connection;
+        journal_table: str - default JOURNAL_TABLE - journal table name.
+    Output:
+        done: set - identifiers of the completed units.
+
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute('create table if not exists ' + journal_table
+                       + ' (unit text primary key)')
+        connection.commit()
+        cursor.execute('select unit from ' + journal_table)
+        return set(row[0] for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+STATEMENT_PREFIXES = ('select ', 'prepare ', 'execute ')
+
+def iter_script_file_events(filepath: str):
+    """
+    Reads the script file back into events: checkpoint markers and
+    statements (with text only). Only 'select', 'prepare' and 'execute'
+    commands are statements; comments and other lines (e.g. totals of
+    the console output) are skipped.
+
+    Input:
+        filepath: str - script file path.
+    Output:
+        generator of events (see 'pipelines_penman.RenderEvent').
+
+    """
+    with open(filepath) as script_file:
+        for line in script_file:
+            line = line.strip()
+            if line.startswith(pen.CHECKPOINT_BEGIN.strip()):
+                unit = line[len(pen.CHECKPOINT_BEGIN):]
+                yield pen.RenderEvent(pen.EVENT_UNIT_START, unit, line, None)
+            elif line.startswith(pen.CHECKPOINT_END.strip()):
+                unit = line[len(pen.CHECKPOINT_END):]
+                yield pen.RenderEvent(pen.EVENT_UNIT_END, unit, line, None)
+            elif line.lower().startswith(STATEMENT_PREFIXES):
+                yield pen.RenderEvent(pen.EVENT_STATEMENT, None, line, None)
+
+def _execute_statement(cursor, event, placeholder: str):
+    """
+    Executes the statement event: as a prepared statement, if the
+    metaload function and its arguments are known, as text otherwise.
+
+    """
+    if event.params is None or event.name not in mtl.PREPARED_SHAPES:
+        if event.text:
+            cursor.execute(event.text)
+        return
+    values = mtl.prepared_values(event.name, event.params)
+    if values is None:
+        return
+    cursor.execute(mtl.prepared_sql(event.name, placeholder), values)
+
+def execute_checkpointed(events, connection, placeholder: str = '?',
+                         journal_table: str = JOURNAL_TABLE):
+    """
+    Executes the events of the checkpointed script. Each unit is
+    written down to the journal and committed in one transaction;
+    units, which are in the journal already, are skipped. If a command
+    fails, the transaction of the unit is rolled back and the error is
+    raised.
+
+    Input:
+        events - iterable of events (generator of the checkpointed
+            script or 'iter_script_file_events');
+        connection - DB-API connection;
+        placeholder: str - default '?' - driver placeholder ('?' for
+            sqlite3, '%s' for psycopg2);
+        journal_table: str - default JOURNAL_TABLE - journal table name.
+    Output:
+        executed: int - number of the executed units;
+        skipped: int - number of the skipped units.
+
+    Raises ValueError on fragment events (the script is rendered with
+    the fragment cache), since they have no parameters.
+
+    """
+    done = load_journal(connection, journal_table)
+    journal_insert = 'insert into ' + journal_table + ' (unit) values (' \
+                     + placeholder + ')'
+    executed = 0
+    skipped = 0
+    unit = None
+    cursor = connection.cursor()
+    try:
+        for event in events:
+            if event.kind == pen.EVENT_UNIT_START:
+                unit = event.name
+            elif event.kind == pen.EVENT_UNIT_END:
+                if unit in done:
+                    skipped += 1
+                else:
+                    cursor.execute(journal_insert, (unit,))
+                    connection.commit()
+                    done.add(unit)
+                    executed += 1
+                unit = None
+            elif event.kind == pen.EVENT_FRAGMENT:
+                raise ValueError(pen.FRAGMENT_ERROR)
+            elif event.kind == pen.EVENT_STATEMENT and unit not in done:
+                _execute_statement(cursor, event, placeholder)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    connection.commit()
+    return executed, skipped
+
+def execute_script_file(filepath: str, connection, placeholder: str = '?',
+                        journal_table: str = JOURNAL_TABLE):
+    """
+    Executes the script file with checkpoint markers (see
+    'execute_checkpointed').
+
+    Input:
+        filepath: str - script file path;
+        connection - DB-API connection;
+        placeholder: str - default '?' - driver placeholder of the
+            journal row;
+        journal_table: str - default JOURNAL_TABLE - journal table name.
+    Output:
+        executed: int - number of the executed units;
+        skipped: int - number of the skipped units.
+
+    """
+    return execute_checkpointed(iter_script_file_events(filepath),
+                                connection, placeholder, journal_table)
@@ -0,0 +1,192 @@
+"""
+
+Local stand-in of the metaload v.1_3 database on sqlite3. It is used
+to check generated commands and catalog-aware generation without the
+server: the metaload functions (see "mtl_v1_3.py") are registered as
+sqlite functions, which write added objects to the catalog tables:
+    mtl_source_system, mtl_source_table, mtl_source_column,
+    mtl_serving_table, mtl_serving_column.
+As on the server, adding an object that already exists raises an
+error. The 'mtl_prj_ctl.' schema prefix of commands is dropped, since
+sqlite has no schemas for functions. The 'prepare' and 'execute'
+commands of the prepared-statement output mode are emulated: the
+prepared shape is kept by the connection and executed with the
+values of the 'execute' command.
+
+"""
+
+import re
+import sqlite3
+import mtl_v1_3 as mtl
+
+CATALOG_DDL = """
+create table mtl_source_system (
+    env_id text, src_name text, descript text,
+    unique (env_id, src_name)
+);
+create table mtl_source_table (
+    tab_id integer primary key, env_id text, src_name text,
+    tablename text, subsystem text, src_schema text, newtablename text,
+    unique (env_id, src_name, src_schema, tablename)
+);
+create table mtl_source_column (
+    tab_id integer, column_name text, data_type text, precision integer,
+    scale integer, key_flg text, batch_flg text, date_prc_flg text,
+    unique (tab_id, column_name)
+);
+create table mtl_serving_table (
+    tab_id integer primary key, env_id text, schema_name text,
+    tablename text, key_shifting_type text,
+    unique (env_id, schema_name, tablename)
+);
+create table mtl_serving_column (
+    tab_id integer, column_name text, data_type text, precision integer,
+    scale integer, key_flg text,
+    unique (tab_id, column_name)
+);
+"""
+
+PREPARE_PATTERN = re.compile(r'\s*prepare\s+(\w+)\s+as\s+(.*?);?\s*$',
+                             re.IGNORECASE | re.DOTALL)
+EXECUTE_PATTERN = re.compile(r'\s*execute\s+(\w+)\s*\((.*)\);?\s*$',
+                             re.IGNORECASE | re.DOTALL)
+
+class StandinCursor(sqlite3.Cursor):
+    """
+    Cursor, that drops the 'mtl_prj_ctl.' schema prefix of commands and
+    emulates 'prepare' and 'execute' commands.
+
+    """
+    def execute(self, sql, parameters = ()):
+        sql = sql.replace('mtl_prj_ctl.', '')
+        match = PREPARE_PATTERN.match(sql)
+        if match:
+            # $1, $2, ... are numbered sqlite parameters ?1, ?2, ...
+            self.connection.prepared[match.group(1)] = re.sub(
+                r'\$(\d+)', r'?\1', match.group(2))
+            return self
+        match = EXECUTE_PATTERN.match(sql)
+        if match:
+            if match.group(1) not in self.connection.prepared:
+                raise sqlite3.OperationalError(
+                    'prepared statement does not exist: ' + match.group(1))
+            values = super().execute('select ' + match.group(2)).fetchone()
+            return super().execute(self.connection.prepared[match.group(1)],
+                                   values)
+        return super().execute(sql, parameters)
+
+class StandinConnection(sqlite3.Connection):
+    """
+    Connection, that creates 'StandinCursor' cursors and keeps
+    prepared shapes.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = dict()
+
+    def cursor(self, factory = StandinCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters = ()):
+        return self.cursor().execute(sql, parameters)
+
+def connect_standin(database: str = ':memory:'):
+    """
+    Opens the stand-in database, creates the catalog tables (if they
+    are absent) and registers the metaload functions.
+
+    Input:
+        database: str - default ':memory:' - sqlite database path.
+    Output:
+        connection: StandinConnection - DB-API connection.
+
+    """
+    connection = sqlite3.connect(database, factory = StandinConnection)
+    exists = connection.execute(
+        "select 1 from sqlite_master where name = 'mtl_source_system'"
+    ).fetchone()
+    if not exists:
+        connection.executescript(CATALOG_DDL)
+    state = {'env_id': None}
+
+    def f_set_version_schema(env_id):
+        state['env_id'] = env_id
+        return env_id
+
+    def f_add_source_system(env_id, src_name, descript):
+        connection.execute(
+            'insert into mtl_source_system values (?, ?, ?)',
+            (env_id, src_name, descript)
+        )
+        return src_name
+
+    def f_add_source_table(env_id, src_name, tablename, subsystem,
+                           src_schema, newtablename):
+        cursor = connection.execute(
+            'insert into mtl_source_table (env_id, src_name, tablename, '
+            'subsystem, src_schema, newtablename) '
+            'values (?, ?, ?, ?, ?, ?)',
+            (env_id, src_name, tablename, subsystem, src_schema,
+             newtablename)
+        )
+        return cursor.lastrowid
+
+    def f_get_tab_id(env_id, src_schema, tablename, src_name):
+        row = connection.execute(
+            'select tab_id from mtl_source_table where env_id = ? '
+            'and src_schema = ? and tablename = ? and src_name = ?',
+            (env_id, src_schema, tablename, src_name)
+        ).fetchone()
+        if row == None:
+            raise ValueError('source table not found: ' + str(tablename))
+        return row[0]
+
+    def f_add_source_column(tab_id, column_name, data_type, precision,
+                            scale, key_flg, batch_flg, date_prc_flg):
+        connection.execute(
+            'insert into mtl_source_column values (?, ?, ?, ?, ?, ?, ?, ?)',
+            (tab_id, column_name, data_type, precision, scale, key_flg,
+             batch_flg, date_prc_flg)
+        )
+        return tab_id
+
+    def f_add_serving_table(env_id, schema_name, tablename,
+                            key_shifting_type):
+        cursor = connection.execute(
+            'insert into mtl_serving_table (env_id, schema_name, tablename, '
+            'key_shifting_type) values (?, ?, ?, ?)',
+            (env_id, schema_name, tablename, key_shifting_type)
+        )
+        return cursor.lastrowid
+
+    def f_get_serving_tab_id(env_id, schema_name, tablename):
+        # serving tables are stored under the generated names
+        servtablename = mtl.serving_table_name("'" + tablename + "'",
+                                               "'" + schema_name + "'")
+        row = connection.execute(
+            'select tab_id from mtl_serving_table where env_id = ? '
+            'and schema_name = ? and tablename = ?',
+            (env_id, schema_name, str(servtablename)[1:-1])
+        ).fetchone()
+        if row == None:
+            raise ValueError('serving table not found: ' + str(tablename))
+        return row[0]
+
+    def f_add_serving_column(tab_id, column_name, data_type, precision,
+                             scale, key_flg):
+        connection.execute(
+            'insert into mtl_serving_column values (?, ?, ?, ?, ?, ?)',
+            (tab_id, column_name, data_type, precision, scale, key_flg)
+        )
+        return tab_id
+
+    functions = [
+        f_set_version_schema, f_add_source_system, f_add_source_table,
+        f_get_tab_id, f_add_source_column, f_add_serving_table,
+        f_get_serving_tab_id, f_add_serving_column
+    ]
+    for function in functions:
+        connection.create_function(function.__name__,
+                                   function.__code__.co_argcount, function)
+    return connection
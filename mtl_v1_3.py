@@ -21,8 +21,57 @@ The performing metaload v.1_3 functions list:
 7) f_get_tab_id()
 8) f_get_serving_table_id()
 
+Each command can also be formed as a prepared statement: the shape of
+the command is prepared once ('prepare_statement') and then executed
+with the parameter values of each row ('execute_statement'). The same
+shapes are given for direct execution through DB-API drivers
+('prepared_sql', 'prepared_values').
+
 """
 
+import re
+
+# version of the command templates; rendered commands of other versions
+# must not be reused
+TEMPLATE_VERSION = '1.2'
+
+# Shapes of the commands for prepared statements: names of the
+# parameters in the order of their numbers ($1, $2, ...) and the command
+# template. Derived parameters (generated table names) are computed by
+# 'prepared_args'.
+PREPARED_SHAPES = {
+    'set_env': (
+        ['env_id'],
+        'mtl_prj_ctl.f_set_version_schema($1)'
+    ),
+    'f_add_source_system': (
+        ['env_id', 'src_name', 'descript'],
+        'f_add_source_system($1, $2, $3)'
+    ),
+    'f_add_source_table': (
+        ['env_id', 'src_name', 'tablename', 'subsystem', 'src_schema',
+         'newtablename'],
+        'f_add_source_table($1, $2, $3, $4, $5, $6)'
+    ),
+    'f_add_source_column': (
+        ['env_id', 'src_schema', 'tablename', 'src_name', 'column_name',
+         'data_type', 'precision', 'scale', 'key_flg', 'batch_flg',
+         'date_prc_flg'],
+        'f_add_source_column(f_get_tab_id($1, $2, $3, $4), '
+        '$5, $6, $7, $8, $9, $10, $11)'
+    ),
+    'f_add_serving_table': (
+        ['env_id', 'schema_name', 'servtablename', 'key_shifting_type'],
+        'f_add_serving_table($1, $2, $3, $4)'
+    ),
+    'f_add_serving_column': (
+        ['env_id', 'schema_name', 'tablename', 'column_name', 'data_type',
+         'precision', 'scale', 'key_flg'],
+        'f_add_serving_column(f_get_serving_tab_id($1, $2, $3), '
+        '$4, $5, $6, $7, $8)'
+    )
+}
+
 def set_env(env_id: str):
     """
 
@@ -124,16 +173,43 @@ def gen_source_table_name(subsystem: str, env_id: str,
         + "'"
     return newtablename
 
+# suffixes of serving table names for the valid logical schemas
+SERVING_TABLE_SUFFIXES = {
+    "'dds_lnk'": '_v',
+    "'dds_lgc'": '_t',
+    "'dds'": '_t'
+}
+
+def serving_table_name(tablename: str, schema_name: str):
+    """
+    Generates a name of a serving table according to naming rules.
+    Returns None for an invalid logical schema, nothing is printed.
+
+    """
+    suffix = SERVING_TABLE_SUFFIXES.get(schema_name)
+    if suffix == None:
+        return
+    return "'" + tablename[1:-1] + suffix + "'"
+
+def serving_table_name_len(tablename_len: int, schema_name: str):
+    """
+    Returns the length of the serving table name (see
+    'serving_table_name') for the length of the quoted table name, or
+    None for an invalid logical schema.
+
+    """
+    suffix = SERVING_TABLE_SUFFIXES.get(schema_name)
+    if suffix == None:
+        return
+    return tablename_len + len(suffix)
+
 def gen_serving_table_name(tablename: str, schema_name: str):
     """
     Generates a name of a source table according to naming rules.
 
     """
-    if schema_name == "'dds_lnk'":
-        servtablename = "'" + tablename[1:-1] + '_v' + "'"
-    elif schema_name == "'dds_lgc'" or schema_name == "'dds'":
-        servtablename = "'" + tablename[1:-1] + '_t' + "'"
-    else:
+    servtablename = serving_table_name(tablename, schema_name)
+    if servtablename == None:
         print('ERROR: Invalid logical schema name!')
         return 
     return servtablename 
@@ -298,6 +374,65 @@ def f_add_serving_column(env_id: str, schema_name: str, tablename: str,
                     + key_flg + ")"
     return commandline
 
+def command_len(func_name: str, lens: dict):
+    """
+    Returns the length of the command line 'select <command>;' of the
+    function of this module without forming the line. The formulas
+    follow the templates of the functions above and must be changed
+    together with them.
+
+    Input:
+        func_name: str - 'set_env' or a name of 'f_add_*' function;
+        lens: dict - lengths of the parameter values, as they are given
+            to the function (quoted text); for 'f_add_serving_table'
+            also 'servtablename' - the length of the serving table name
+            (see 'serving_table_name_len').
+    Output:
+        length: int - length of the command line.
+
+    """
+    # CONSTANTS
+    SEP = len(', ')
+    QUOTES = len("''")
+    # body
+    if func_name == 'set_env':
+        length = len("mtl_prj_ctl.f_set_version_schema()") + lens['env_id']
+    elif func_name == 'f_add_source_system':
+        length = len("f_add_source_system()") \
+                 + lens['env_id'] + lens['src_name'] + lens['descript'] \
+                 + 2 * SEP
+    elif func_name == 'f_add_source_table':
+        # 'subsystem__env_id__src_name__tablename__data'
+        newtablename = lens['subsystem'] + lens['env_id'] \
+                       + lens['src_name'] + lens['tablename'] - 4 * QUOTES \
+                       + 3 * len('__') + len('__data') + QUOTES
+        length = len("f_add_source_table()") \
+                 + lens['env_id'] + lens['src_name'] + lens['tablename'] \
+                 + lens['subsystem'] + lens['src_schema'] + newtablename \
+                 + 5 * SEP
+    elif func_name == 'f_add_source_column':
+        tab_id = len('f_get_tab_id()') \
+                 + lens['env_id'] + lens['src_schema'] + lens['tablename'] \
+                 + lens['src_name'] + 3 * SEP
+        length = len("f_add_source_column()") + tab_id \
+                 + lens['column_name'] + lens['data_type'] \
+                 + lens['precision'] + lens['scale'] + lens['key_flg'] \
+                 + lens['batch_flg'] + lens['date_prc_flg'] + 7 * SEP
+    elif func_name == 'f_add_serving_table':
+        length = len("f_add_serving_table()") \
+                 + lens['env_id'] + lens['schema_name'] \
+                 + lens['servtablename'] + lens['key_shifting_type'] \
+                 + 3 * SEP
+    elif func_name == 'f_add_serving_column':
+        tab_id = len("f_get_serving_tab_id()") \
+                 + lens['env_id'] + lens['schema_name'] + lens['tablename'] \
+                 + 2 * SEP
+        length = len("f_add_serving_column()") + tab_id \
+                 + lens['column_name'] + lens['data_type'] \
+                 + lens['precision'] + lens['scale'] + lens['key_flg'] \
+                 + 5 * SEP
+    return length + len(pre_post_fix(''))
+
 def pre_post_fix(line: str, prefix: str = "select ", postfix: str = ";"):
     """
     Add the prefix and the postfix to the line.
@@ -307,3 +442,110 @@ def pre_post_fix(line: str, prefix: str = "select ", postfix: str = ";"):
     result = prefix + line + postfix
     return result
 
+def prepared_name(func_name: str):
+    """
+    Returns the name of the prepared statement for the command.
+
+    """
+    return 'mtl_' + func_name
+
+def prepare_statement(func_name: str):
+    """
+
+    Form a text of command, that prepares the shape of the command:
+        prepare mtl_<func_name> as select <command template>;
+
+    Input:
+        func_name: str - name of the function of this module, that
+            forms the command (a key of PREPARED_SHAPES).
+    Output:
+        commandline: str - text of the command.
+
+    """
+    names, template = PREPARED_SHAPES[func_name]
+    return pre_post_fix(template,
+                        prefix = 'prepare ' + prepared_name(func_name) \
+                                 + ' as select ')
+
+def prepared_args(func_name: str, params: dict):
+    """
+    Returns the list of parameter values of the prepared command.
+
+    Input:
+        func_name: str - name of the function of this module, that
+            forms the command (a key of PREPARED_SHAPES);
+        params: dict - keyword arguments of that function.
+    Output:
+        args: list - parameter values in the order of the shape;
+            None if the command can not be formed.
+
+    """
+    args = dict(params)
+    if func_name == 'f_add_source_table':
+        args['newtablename'] = gen_source_table_name(args['subsystem'],
+                                                     args['env_id'],
+                                                     args['src_name'],
+                                                     args['tablename'])
+    elif func_name == 'f_add_serving_table':
+        args['servtablename'] = serving_table_name(args['tablename'],
+                                                   args['schema_name'])
+        if args['servtablename'] == None:
+            return
+    names, template = PREPARED_SHAPES[func_name]
+    return [args[name] for name in names]
+
+def execute_statement(func_name: str, params: dict):
+    """
+
+    Form a text of command, that executes the prepared command:
+        execute mtl_<func_name>(<parameter values>);
+
+    Input:
+        func_name: str - name of the function of this module, that
+            forms the command (a key of PREPARED_SHAPES);
+        params: dict - keyword arguments of that function.
+    Output:
+        commandline: str - text of the command.
+
+    """
+    args = prepared_args(func_name, params)
+    if args == None:
+        return ''
+    commandline = prepared_name(func_name) + "(" \
+                    + ', '.join([str(arg) for arg in args]) + ")"
+    return pre_post_fix(commandline, prefix = 'execute ')
+
+def prepared_sql(func_name: str, placeholder: str = '?'):
+    """
+    Returns the shape of the command as a query for DB-API drivers:
+    the parameters are replaced by the driver placeholder ('?' for
+    sqlite3, '%s' for psycopg2). The driver prepares the query once
+    and reuses it for all rows.
+
+    """
+    names, template = PREPARED_SHAPES[func_name]
+    return 'select ' + re.sub(r'\$\d+', placeholder, template)
+
+def sql_value(literal):
+    """
+    Transforms a literal of a command to a value for DB-API drivers:
+    'null' -> None; "'text'" -> 'text'; others are not changed.
+
+    """
+    if literal == 'null':
+        return None
+    if type(literal) is str and len(literal) > 1 \
+       and literal[0] == "'" and literal[-1] == "'":
+        return literal[1:-1]
+    return literal
+
+def prepared_values(func_name: str, params: dict):
+    """
+    Returns the parameter values of the command for DB-API drivers
+    (see 'prepared_sql'); None if the command can not be formed.
+
+    """
+    args = prepared_args(func_name, params)
+    if args == None:
+        return
+    return [sql_value(arg) for arg in args]
@@ -11,24 +11,56 @@ required parameters are formed by module "mtl_v1_3.py" tools.
 DONE:
 Way to take required parameters for creating tables from
 configuration files developed. Regrouping and transition readed
-parameters to writing functions are implemented. Writing functions
-do not write command text into any output file, they just print text
-into console.
+parameters to writing functions are implemented. The text is rendered
+by generators of events (statements and section markers), which can
+be used as a library API without any printing; writing functions
+print the text into console.
+Multi-environment fan-out: the script is rendered once with an env_id
+marker and written down to a file for each environment. Table
+cfg-files of any size can be read as a stream and grouped by an
+external sort (sorted runs are spilled to temporary files and merged).
+In the prepared-statement output mode each command shape is prepared
+once and then executed with the row values. Catalog-aware generation:
+objects, which already exist in the environment, are read by bulk
+catalog queries and are not added again. Rendered command lines of
+each table can be kept in a fragment cache (in memory with LRU
+eviction and on disk) and reused while the table cfg rows are not
+changed. Several table cfg-files can be parsed and rendered in
+parallel by a process pool. Parsed configs can be kept in an indexed
+SQLite store (see "cfg_store.py"). Repeated parameter blocks of the
+same objects can be dropped (the first one is kept, conflicting ones
+are reported). In the checkpointed layout logical units (a
+source-system, a table with its columns) are marked by checkpoints
+with stable identifiers, so a failed deploy can be resumed (see
+"mtl_deploy.py"). Dry-run statistics (numbers of commands and the
+estimated size of the script) are counted without forming command
+lines. Partial generation: rows can be filtered by env_id, src_name,
+schema and tablename (glob) inside the reader, before they are parsed.
 
 PLANNED:
-Writing code in a file. Reading and writing functions for DAG command
-block.
+Reading and writing functions for DAG command block.
 
 """
 
 import mtl_v1_3 as mtl
 import csv
+import fnmatch
+import collections
+import hashlib
+import heapq
+import itertools
+import json
+import operator
+import concurrent.futures
+import os
+import tempfile
+import threading
 
 ##############################################################################
 ## read configuration files block ############################################
 ##############################################################################
 
-def csv_reader(filepath: str, delimiter:str = ';'):
+def csv_reader(filepath: str, delimiter:str = ';', row_filter = None):
     """
     Separates csv-configuration-file on two parts: column of field
     names (or field labels) and values (one or more items).
@@ -42,12 +74,37 @@ def csv_reader(filepath: str, delimiter:str = ';'):
     
     Input:
         filepath: str - configuration file path;
-        delimiter: str - default ';' - string element separator.
+        delimiter: str - default ';' - string element separator;
+        row_filter - default None - rows filter (see 'row_filter').
     Output:
         labels: list - list of value labels (parameter row labels);
         values: list of lists - list of inner lists with values;
             allowed empty inner lists.
 
+    """
+    labels = list()
+    values = list()
+    for label, info in csv_row_stream(filepath, delimiter = delimiter,
+                                      row_filter = row_filter):
+        labels.append(label)
+        values.append(info)
+    return labels, values
+
+def csv_row_stream(filepath: str, delimiter:str = ';', row_filter = None):
+    """
+    Reads csv-configuration-file row by row. The requirements to the
+    input file are the same as for 'csv_reader'. Rows rejected by the
+    filter are skipped right after splitting, before their values are
+    collected.
+
+    Input:
+        filepath: str - configuration file path;
+        delimiter: str - default ';' - string element separator;
+        row_filter - default None - rows filter (see 'row_filter').
+    Output:
+        generator of pairs (label, values): label - parameter row
+            label; values - list of the row values.
+
     """
     # CONSTANTS
     #     defining column numbers
@@ -55,16 +112,92 @@ def csv_reader(filepath: str, delimiter:str = ';'):
     LBL_COL_NO = 1
     PRMT_COL_NO = 2
     # body
-    labels = list()
-    values = list()
     with open(filepath) as cfg_file:
         file = csv.reader(cfg_file, delimiter = delimiter)
         for row in file:
+            label = row[LBL_COL_NO]
+            if row_filter is not None \
+               and not row_filter(label, row, PRMT_COL_NO):
+                continue
             elem_count = int(row[SERV_COL_NO])
-            labels.append(row[LBL_COL_NO])
             info = [row[i] for i in range(PRMT_COL_NO, elem_count+1)]
-            values.append(info)
-    return labels, values
+            yield label, info
+
+def row_filter(headers: dict, env_id: str = None, src_name: str = None,
+               schema_name: str = None, tablename: str = None):
+    """
+    Forms the rows filter for partial generation. The filter checks
+    only the key fields of a row, so rows are rejected before any
+    dictionary is formed. Filters, which are not given, pass all rows.
+     - env_id and src_name are checked in general rows ('env' rows
+    have no src_name and pass);
+     - src_name, schema_name (src_schema of source rows) and tablename
+    (glob pattern, e.g. 'client_*') are checked in table rows; serving
+    rows have no src_name and are rejected by it; env_id is not checked
+    there, since table rows have no environment.
+    Rows with other labels (comments, headers) always pass.
+
+    Input:
+        headers: dict - dictionaries with parameter names for
+            diferent sets (of the general or the table cfg-file);
+        env_id, src_name, schema_name, tablename: str - default None -
+            required values of key fields (without quotes).
+    Output:
+        row_filter - function (label, row, start) -> bool, where row is
+            a list of fields and start is the index of the first
+            parameter in it; None, if no filters are given.
+
+    """
+    # CONSTANTS
+    GEN_MODES = ('env', 'src_sys')
+    # body
+    if env_id is None and src_name is None and schema_name is None \
+       and tablename is None:
+        return None
+    checks = dict()
+    for mode, hdrs in headers.items():
+        if mode in GEN_MODES:
+            fields = [(['env_id'], env_id, False),
+                      (['src_name'], src_name, False)]
+        else:
+            fields = [(['src_name'], src_name, True),
+                      (['src_schema', 'schema_name'], schema_name, True),
+                      (['tablename'], tablename, True)]
+        mode_checks = list()
+        for names, value, required in fields:
+            if value is None:
+                continue
+            names = [name for name in names if name in hdrs]
+            if not names:
+                if required:
+                    mode_checks = None
+                    break
+                continue
+            index = list(hdrs).index(names[0])
+            if names[0] == 'tablename':
+                pattern = str(value)
+                mode_checks.append(
+                    (index,
+                     lambda item, pattern = pattern:
+                         fnmatch.fnmatchcase(item, pattern))
+                )
+            else:
+                value = str(value).replace("'", "")
+                mode_checks.append(
+                    (index, lambda item, value = value: item == value)
+                )
+        checks[mode] = mode_checks
+
+    def accept(label, row, start):
+        mode_checks = checks.get(label, ())
+        if mode_checks is None:
+            return False
+        for index, check in mode_checks:
+            if not check(row[start + index]):
+                return False
+        return True
+
+    return accept
 
 def dict_formation(lable, keys: list, items: list):
     """
@@ -88,7 +221,7 @@ def dict_formation(lable, keys: list, items: list):
     return new_dict
     
 def gen_params_extract(mode_list: list, prmts: list,
-                       prmt_hdrs: list, start_i: int = 0
+                       prmt_hdrs: list, start_i: int = 0, row_filter = None
                       ):
     """
     Rerurn list of dictionaries, each of them contains a row of
@@ -103,7 +236,8 @@ def gen_params_extract(mode_list: list, prmts: list,
         prmt_hdrs: list - list of dictionaries of parameter names
             (result dict <keys>) for possible 'mode' values
         start_i: int - default value: 0 - initial index from which
-            processing of lists 'mode_list' and 'prmts' begins.
+            processing of lists 'mode_list' and 'prmts' begins;
+        row_filter - default None - rows filter (see 'row_filter').
     Output:
         gen_funcs_params: list - list of dictionaries with pairs 
             <prmt_hdr>-<prmt> and pair a key <'mode'>-<mode_value>.
@@ -121,6 +255,8 @@ def gen_params_extract(mode_list: list, prmts: list,
         mode = mode_list[i]
         hdrs = prmt_hdrs[mode]
         prmts_i = prmts[i]
+        if row_filter is not None and not row_filter(mode, prmts_i, 0):
+            continue
         if mode == NAME_2:
             second_list.append(
                 dict_formation(mode, hdrs, prmts_i)
@@ -131,7 +267,8 @@ def gen_params_extract(mode_list: list, prmts: list,
             )
     return first_list, second_list
 
-def gen_cfg_file_preparation(filepath: str, delimiter:str = ';'):
+def gen_cfg_file_preparation(filepath: str, delimiter:str = ';',
+                             filters: dict = None):
     """
     Extract from general cfg-file in csv-format сonfiguration
     data and parameters for metaload functions that set envitonment
@@ -140,7 +277,9 @@ def gen_cfg_file_preparation(filepath: str, delimiter:str = ';'):
 
     Input:
         filepath: str - configuration file path;
-        delimiter: str - default ';' - string element separator.
+        delimiter: str - default ';' - string element separator;
+        filters: dict - default None - keyword arguments of
+            'row_filter' (env_id, src_name); the headers are always read.
     Output:
         in_gen_param_data: list of dicts - parameter value block for
             general functions (set_env and add_src_schema);
@@ -181,7 +320,9 @@ def gen_cfg_file_preparation(filepath: str, delimiter:str = ';'):
     while labels[start_i] != '#cfg_end':
         start_i += 1
     
-    gen_prmtrs1, gen_prmtrs2 = gen_params_extract(labels, values, hdrs_gen, start_i+1) 
+    gen_filter = row_filter(hdrs_gen, **(filters or {}))
+    gen_prmtrs1, gen_prmtrs2 = gen_params_extract(labels, values, hdrs_gen,
+                                                  start_i+1, gen_filter)
     for second_list_row in gen_prmtrs2:
         gen_prmtrs1.append(second_list_row)
     out = [
@@ -236,7 +377,8 @@ def tab_params_extract(mode_list: list, prmts: list,
 
     return out_list
 
-def tab_cfg_file_preparation(filepath: str, headers: list, delimiter:str = ';'):
+def tab_cfg_file_preparation(filepath: str, headers: list, delimiter:str = ';',
+                             filters: dict = None):
     """
     Extract from table cfg-file - in csv-format - сonfiguration data
     and parameters for metaload functions, which add source and
@@ -246,17 +388,45 @@ def tab_cfg_file_preparation(filepath: str, headers: list, delimiter:str = ';'):
         filepath: str - configuration file path;
         headers: list - list of dictionaries with parameter names for
             diferent sets;
-        delimiter: str - default ';' - string element separator.
+        delimiter: str - default ';' - string element separator;
+        filters: dict - default None - keyword arguments of
+            'row_filter' (src_name, schema_name, tablename).
     Output:
         in_tab_param_data: list of dicts - parameter value block for
             table functions (add_{source/serving}_{table/column}).
 
     """
-    labels, values = csv_reader(filepath, delimiter = delimiter)
+    labels, values = csv_reader(filepath, delimiter = delimiter,
+                                row_filter = row_filter(headers,
+                                                        **(filters or {})))
     in_tab_param_data = tab_params_extract(labels,values, headers)
 
     return in_tab_param_data
 
+def tab_params_stream(filepath: str, headers: list, delimiter:str = ';',
+                      filters: dict = None):
+    """
+    Stream version of 'tab_cfg_file_preparation': the parameter blocks
+    are formed one by one, the file is not loaded into memory.
+
+    Input:
+        filepath: str - configuration file path;
+        headers: list - list of dictionaries with parameter names for
+            diferent sets;
+        delimiter: str - default ';' - string element separator;
+        filters: dict - default None - keyword arguments of
+            'row_filter' (src_name, schema_name, tablename).
+    Output:
+        generator of dicts - parameter blocks for table functions.
+
+    """
+    tab_filter = row_filter(headers, **(filters or {}))
+    for mode, prmts in csv_row_stream(filepath, delimiter = delimiter,
+                                      row_filter = tab_filter):
+        if mode[0] == '#':
+            continue
+        yield dict_formation(mode, headers[mode], prmts)
+
 def rd2wrt_transcriptor(d: dict):
     """
     Transforms dictionary items depending on their values.
@@ -288,6 +458,37 @@ def rd2wrt_transcriptor(d: dict):
 ## output of the resulting program text ######################################
 ##############################################################################
 
+# Rendering is done by generators: they take parsed cfg data and yield
+# events one by one, hold no global state and print nothing, so many of
+# them can run concurrently. Each generator returns (StopIteration.value)
+# the same result as the corresponding 'writedown_*' function, which
+# just prints the text of the events.
+
+# kinds of events
+EVENT_STATEMENT = 'statement'
+EVENT_SECTION_START = 'section_start'
+EVENT_SECTION_END = 'section_end'
+EVENT_ERROR = 'error'
+EVENT_PREPARE = 'prepare'
+EVENT_FRAGMENT = 'fragment'
+EVENT_UNIT_START = 'unit_start'
+EVENT_UNIT_END = 'unit_end'
+# text of the error event of a serving table with invalid schema
+SCHEMA_ERROR = '-- ERROR: Invalid logical schema name: '
+# message of transformations, which need statement events
+FRAGMENT_ERROR = 'Fragment events can not be transformed, ' \
+                 'render the script without the fragment cache'
+
+# kind: str - one of the EVENT_* values;
+# name: str - metaload function name for statements, section name for
+#     section markers, unit identifier for checkpoint markers;
+# text: str - text of the event;
+# params: dict - keyword arguments of the metaload function ('mtl_v1_3')
+#     for statements, the parameter block for errors of blocks, None for
+#     other events.
+RenderEvent = collections.namedtuple('RenderEvent',
+                                     ['kind', 'name', 'text', 'params'])
+
 def add_comment(comment_text: str, char_count: int = 100):
     """
     Prepares a comment line with input text and the specified length.
@@ -306,6 +507,167 @@ def add_comment(comment_text: str, char_count: int = 100):
     comment_line = comment_start + comment_text + comment_end
     return comment_line
 
+def statement_event(func_name: str, params: dict):
+    """
+    Forms the statement event: the command of the metaload function
+    from 'mtl_v1_3' module with given keyword arguments.
+
+    Input:
+        func_name: str - name of the function in 'mtl_v1_3' module;
+        params: dict - keyword arguments of the function.
+    Output:
+        event: RenderEvent - statement event.
+
+    """
+    text = mtl.pre_post_fix(getattr(mtl, func_name)(**params))
+    return RenderEvent(EVENT_STATEMENT, func_name, text, params)
+
+def section_start(name: str):
+    """
+    Forms the event, that opens the section of the script.
+
+    """
+    return RenderEvent(EVENT_SECTION_START, name, add_comment('ADD ' + name),
+                       None)
+
+def section_end(name: str):
+    """
+    Forms the event, that closes the section of the script.
+
+    """
+    return RenderEvent(EVENT_SECTION_END, name, add_comment('END ' + name),
+                       None)
+
+def row_statement(params: dict, env_id: str):
+    """
+    Forms the statement event for a parameter block of a table
+    cfg-file depending on its 'mode'. A serving table of an invalid
+    logical schema gives the error event (a comment line) instead.
+
+    Input:
+        params: dict - parameter block;
+        env_id: str - an identifier of environment where tables will
+            be created.
+    Output:
+        event: RenderEvent - statement or error event.
+
+    """
+    mode = params['mode']
+    if mode == 'src_table':
+        return statement_event('f_add_source_table', dict(
+            env_id = env_id,
+            src_name = params['src_name'],
+            tablename = params['tablename'],
+            subsystem = params['subsystem'],
+            src_schema = params['src_schema']
+        ))
+    elif mode == 'src_col':
+        return statement_event('f_add_source_column', dict(
+            tablename = params['tablename'],
+            env_id = env_id,
+            src_name = params['src_name'],
+            src_schema = params['src_schema'],
+            column_name = params['column_name'],
+            data_type = params['data_type'],
+            precision = params['precision'],
+            scale = params['scale'],
+            key_flg = params['key_flg'],
+            batch_flg = params['batch_flg'],
+            date_prc_flg = params['date_prc_flg']
+        ))
+    elif mode == 'serv_table':
+        if mtl.serving_table_name(params['tablename'],
+                                  params['schema_name']) == None:
+            return RenderEvent(EVENT_ERROR, 'InvalidSchemaError',
+                               SCHEMA_ERROR + str(params['schema_name']),
+                               params)
+        return statement_event('f_add_serving_table', dict(
+            env_id = env_id,
+            schema_name = params['schema_name'],
+            tablename = params['tablename'],
+            key_shifting_type = params['key_shifting_type']
+        ))
+    elif mode == 'serv_col':
+        return statement_event('f_add_serving_column', dict(
+            env_id = env_id,
+            schema_name = params['schema_name'],
+            tablename = params['tablename'],
+            column_name = params['column_name'],
+            data_type = params['data_type'],
+            precision = params['precision'],
+            scale = params['scale'],
+            key_flg = params['key_flg']
+        ))
+
+def format_event(event: RenderEvent):
+    """
+    Returns the text of the event as it is written down to the script.
+    Commands that set the environment are separated by an empty line.
+
+    """
+    if event.kind == EVENT_STATEMENT and event.name == 'set_env':
+        return '\n' + event.text
+    return event.text
+
+def print_events(events):
+    """
+    Prints the text of the events from the generator.
+
+    Input:
+        events - generator of the events.
+    Output:
+        result - the value returned by the generator.
+
+    """
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as stop:
+            return stop.value
+        print(format_event(event))
+
+def render_events(events):
+    """
+    Collects the text of the events from the generator.
+
+    Input:
+        events - generator of the events.
+    Output:
+        text: str - text of the events, a line for each one;
+        result - the value returned by the generator.
+
+    """
+    lines = list()
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as stop:
+            return ''.join(lines), stop.value
+        lines.append(format_event(event) + '\n')
+
+def iter_general_data(in_data: list):
+    """
+    Generator version of 'writedown_general_data'.
+
+    """
+    # Constants
+    START_ID = 1
+    # function body
+    src_systems_count =  len(in_data) - START_ID
+    env_id = in_data[0]['env_id']
+    N = len(in_data)
+    yield statement_event('set_env',
+                          dict(env_id = in_data[START_ID]['env_id']))
+    yield section_start('SOURCE_SYSTEMS')
+    for id in range(START_ID, N):
+        params = in_data[id]
+        yield statement_event('f_add_source_system', dict(
+            env_id = params['env_id'],
+            src_name = params['src_name'],
+            descript = params['descript']
+        ))
+    return env_id, src_systems_count
+
 def writedown_general_data(in_data: list):
     """
     Writes down command lines related to setting environment and
@@ -320,7 +682,6 @@ def writedown_general_data(in_data: list):
     """
     # Constants
     LIMIT = 4
-    START_ID = 1
     SHOW_INPUT_CONTENT = False
     # function body
     if SHOW_INPUT_CONTENT:
@@ -329,21 +690,58 @@ def writedown_general_data(in_data: list):
             input_row_count = LIMIT
         for id in range(input_row_count):
             print(id, in_data[id], sep = '\t')
-    src_systems_count =  len(in_data) - START_ID
-    env_id = in_data[0]['env_id']
+    return print_events(iter_general_data(in_data))
+
+# sections of the runs of parameter blocks with the same 'mode'
+ROW_SECTIONS = {
+    'src_table': 'SOURCE_TABLES',
+    'src_col': 'SOURCE_COLUMNS',
+    'serv_table': 'SERVING_TABLES',
+    'serv_col': 'SERVING_COLUMNS'
+}
+
+def iter_add_rows(in_data: list, env_id: str, id: int, mode: str,
+                  cache: dict = None):
+    """
+    Yields the section of command lines for the run of parameter
+    blocks with the given 'mode', that starts at the row 'id'.
+    If the fragment cache is given, the command lines of each block
+    (see 'FRAGMENT_BLOCKS') are yielded as one fragment event (rendered
+    text, see 'fragment_event') instead of statement events; such
+    output is for the text only.
+
+    Input:
+        in_data: list - list of parameter blocks (in 'dict' type);
+        env_id: str - an identifier of environment where tables will
+            be created;
+        id: int - the in_data list row number from which this function
+            starts its work;
+        mode: str - 'src_table', 'src_col', 'serv_table' or
+            'serv_col';
+        cache: dict - default None - fragment cache (see
+            'fragment_cache').
+    Output:
+        stop_id: int - the in_data list row number, where this function
+            stoped its work.
+
+    """
     N = len(in_data)
-    print('\n' + \
-          mtl.pre_post_fix(mtl.set_env(in_data[START_ID]['env_id']))
-          )
-    print(add_comment('ADD SOURCE_SYSTEMS'))
-    for id in range(START_ID, N):
-        params = in_data[id]
-        print(mtl.pre_post_fix(mtl.f_add_source_system(
-            params['env_id'],
-            params['src_name'],
-            params['descript']
-             )))
-    return env_id, src_systems_count
+    block_key = operator.itemgetter(*FRAGMENT_BLOCKS[mode])
+    yield section_start(ROW_SECTIONS[mode])
+    while id < N and in_data[id]['mode'] == mode:
+        if cache is None:
+            yield row_statement(in_data[id], env_id)
+            id += 1
+            continue
+        block = block_key(in_data[id])
+        stop_id = id + 1
+        while stop_id < N and in_data[stop_id]['mode'] == mode \
+              and block_key(in_data[stop_id]) == block:
+            stop_id += 1
+        yield fragment_event(in_data[id:stop_id], env_id, cache)
+        id = stop_id
+    yield section_end(ROW_SECTIONS[mode])
+    return id
 
 def writedown_add_src_tables(in_data: list, env_id: str, id: int):
     """
@@ -360,26 +758,7 @@ def writedown_add_src_tables(in_data: list, env_id: str, id: int):
             stoped its work.
 
     """
-    N = len(in_data)
-    print(add_comment('ADD SOURCE_TABLES'))
-    if id < N:
-        running_flag = in_data[id]['mode'] == 'src_table'
-    else: running_flag = False
-    while running_flag:
-        params = in_data[id]
-        print(mtl.pre_post_fix(mtl.f_add_source_table(
-            env_id,
-            params['src_name'],
-            params['tablename'],
-            params['subsystem'],
-            params['src_schema']
-        )))
-        id += 1
-        if id < N:
-            running_flag = in_data[id]['mode'] == 'src_table'
-        else: running_flag = False
-    print(add_comment('END SOURCE_TABLES'))
-    return id
+    return print_events(iter_add_rows(in_data, env_id, id, 'src_table'))
 
 def writedown_add_src_columns(in_data: list, env_id: str, id: int):
     """
@@ -396,47 +775,12 @@ def writedown_add_src_columns(in_data: list, env_id: str, id: int):
             stoped its work.
 
     """
-    N = len(in_data)
-    print(add_comment('ADD SOURCE_COLUMNS'))
-    if id < N:
-        running_flag = in_data[id]['mode'] == 'src_col'
-    else: running_flag = False
-    while running_flag:
-        params = in_data[id]
-        print(mtl.pre_post_fix(mtl.f_add_source_column(
-                tablename = params['tablename'],
-                env_id = env_id,
-                src_name = params['src_name'],
-                src_schema = params['src_schema'],
-                column_name = params['column_name'],
-                data_type = params['data_type'],
-                precision = params['precision'],
-                scale = params['scale'],
-                key_flg = params['key_flg'],
-                batch_flg = params['batch_flg'],
-                date_prc_flg = params['date_prc_flg']
-        )))
-        id += 1
-        if id < N:
-            running_flag = in_data[id]['mode'] == 'src_col'
-        else: running_flag = False
-    print(add_comment('END SOURCE_COLUMNS'))
-    return id
+    return print_events(iter_add_rows(in_data, env_id, id, 'src_col'))
 
-def writedown_src_tables(in_data: list, env_id, id: int = 0):
+def iter_src_tables(in_data: list, env_id, id: int = 0,
+                    cache: dict = None):
     """
-    Writes down command lines that creates source tables and fields
-    in them for different source systems. Command lines are separated
-    by systems at first, then, inside each system, by tables and
-    fields.
-
-    Input:
-        in_data: list - list of parameter blocks (in 'dict' type).
-        env_id: str - an identifier of environment where tables will
-        be created.
-    Output:
-        stop_id: int - the in_data list row number, where this function
-        stoped its work.
+    Generator version of 'writedown_src_tables'.
 
     """
     # constants
@@ -450,28 +794,45 @@ def writedown_src_tables(in_data: list, env_id, id: int = 0):
     else: src_tab_flag = False
     while src_tab_flag:
         current_src_name = in_data[id]['src_name']
-        print(add_comment('ADD SOURCE_SYSTEM ' \
-                          + current_src_name.replace("'", ""))
-              )
-        print('\n' + \
-              mtl.pre_post_fix(mtl.set_env(env_id)))
+        system = 'SOURCE_SYSTEM ' + current_src_name.replace("'", "")
+        yield section_start(system)
+        yield statement_event('set_env', dict(env_id = env_id))
         
-        id = writedown_add_src_tables(in_data, env_id, id)
-        id = writedown_add_src_columns(in_data, env_id, id)
+        id = yield from iter_add_rows(in_data, env_id, id, 'src_table',
+                                      cache)
+        id = yield from iter_add_rows(in_data, env_id, id, 'src_col', cache)
         
-        print(add_comment('END SOURCE_SYSTEM ' \
-                          + current_src_name.replace("'", "")))
+        yield section_end(system)
         if id < N:
             src_tab_flag = in_data[id]['mode'] == 'src_table' or \
                            in_data[id]['mode'] == 'src_col'
         else: src_tab_flag = False
         iter += 1
         if iter > ITER_LIMIT:
-            print('TimeOutError')
+            yield RenderEvent(EVENT_ERROR, 'TimeOutError', 'TimeOutError',
+                              None)
             break
     
     return id
 
+def writedown_src_tables(in_data: list, env_id, id: int = 0):
+    """
+    Writes down command lines that creates source tables and fields
+    in them for different source systems. Command lines are separated
+    by systems at first, then, inside each system, by tables and
+    fields.
+
+    Input:
+        in_data: list - list of parameter blocks (in 'dict' type).
+        env_id: str - an identifier of environment where tables will
+        be created.
+    Output:
+        stop_id: int - the in_data list row number, where this function
+        stoped its work.
+
+    """
+    return print_events(iter_src_tables(in_data, env_id, id))
+
 def writedown_add_serv_tables(in_data: list, env_id: str, id: int):
     """
     Writes down command lines that creates serving tables.
@@ -485,25 +846,7 @@ def writedown_add_serv_tables(in_data: list, env_id: str, id: int):
         stop_id: int - - the in_data list row number, where this function
             stoped its work.
     """
-    N = len(in_data)
-    print(add_comment('ADD SERVING_TABLES'))
-    if id < N:
-        running_flag = in_data[id]['mode'] == 'serv_table'
-    else: running_flag = False
-    while running_flag:
-        params = in_data[id]
-        print(mtl.pre_post_fix(mtl.f_add_serving_table(
-            env_id = env_id,
-            schema_name = params['schema_name'],
-            tablename = params['tablename'],
-            key_shifting_type = params['key_shifting_type']
-        )))
-        id += 1
-        if id < N:
-            running_flag = in_data[id]['mode'] == 'serv_table'
-        else: running_flag = False
-    print(add_comment('END SERVING_TABLES'))
-    return id
+    return print_events(iter_add_rows(in_data, env_id, id, 'serv_table'))
 
 def writedown_add_serv_columns(in_data: list, env_id: str, id: int):
     """
@@ -520,28 +863,39 @@ def writedown_add_serv_columns(in_data: list, env_id: str, id: int):
             stoped its work.
 
     """
+    return print_events(iter_add_rows(in_data, env_id, id, 'serv_col'))
+
+def iter_serv_tables(in_data: list, env_id: str, id: int,
+                     cache: dict = None):
+    """
+    Generator version of 'writedown_serv_tables'.
+
+    """
+    # constants
+    ITER_LIMIT = 5000
+    # function body
     N = len(in_data)
-    print(add_comment('ADD SERVING_COLUMNS'))
+    iter = 0
     if id < N:
-        running_flag = in_data[id]['mode'] == 'serv_col'
-    else: running_flag = False
-    while running_flag:
-        params = in_data[id]
-        print(mtl.pre_post_fix(mtl.f_add_serving_column(
-            env_id = env_id,
-            schema_name = params['schema_name'],
-            tablename = params['tablename'],
-            column_name = params['column_name'],
-            data_type = params['data_type'],
-            precision = params['precision'],
-            scale = params['scale'],
-            key_flg = params['key_flg']
-        )))
-        id += 1
+        serv_tab_flag = in_data[id]['mode'] == 'serv_table' or \
+                        in_data[id]['mode'] == 'serv_col'
+    else: serv_tab_flag = False
+    yield section_start('SERVING_LAYERS')
+    yield statement_event('set_env', dict(env_id = env_id))
+    while serv_tab_flag:
+        id = yield from iter_add_rows(in_data, env_id, id, 'serv_table',
+                                      cache)
+        id = yield from iter_add_rows(in_data, env_id, id, 'serv_col', cache)
         if id < N:
-            running_flag = in_data[id]['mode'] == 'serv_col'
-        else: running_flag = False
-    print(add_comment('END SERVING_COLUMNS'))
+            serv_tab_flag = in_data[id]['mode'] == 'serv_table' or \
+                            in_data[id]['mode'] == 'serv_col'
+        else: serv_tab_flag = False
+        iter += 1
+        if iter > ITER_LIMIT:
+            yield RenderEvent(EVENT_ERROR, 'TimeOutError', 'TimeOutError',
+                              None)
+            break
+    yield section_end('SERVING_LAYERS')
     return id
 
 def writedown_serv_tables(in_data: list, env_id: str, id: int):
@@ -561,29 +915,1218 @@ def writedown_serv_tables(in_data: list, env_id: str, id: int):
         stop_id: int - the in_data list row number, where this function
             stoped its work.
     """
-    # constants
-    ITER_LIMIT = 5000
-    # function body
-    N = len(in_data)
-    iter = 0
-    if id < N:
-        serv_tab_flag = in_data[id]['mode'] == 'serv_table' or \
-                        in_data[id]['mode'] == 'serv_col'
-    else: serv_tab_flag = False
-    print(add_comment('ADD SERVING_LAYERS'))
-    print('\n' + \
-              mtl.pre_post_fix(mtl.set_env(env_id)))
-    while serv_tab_flag:
-        id = writedown_add_serv_tables(in_data, env_id, id)
-        id = writedown_add_serv_columns(in_data, env_id, id)
-        if id < N:
-            serv_tab_flag = in_data[id]['mode'] == 'serv_table' or \
-                            in_data[id]['mode'] == 'serv_col'
-        else: serv_tab_flag = False
-        iter += 1
-        if iter > ITER_LIMIT:
-            print('TimeOutError')
-            break
-    print(add_comment('END SERVING_LAYERS'))
+    return print_events(iter_serv_tables(in_data, env_id, id))
+
+def iter_script(gen_data: list, tab_data: list, cache: dict = None):
+    """
+    Yields the events of the whole script: setting environment, adding
+    source-systems, source tables and serving tables. The input lists
+    must contain transcribed parameter blocks (see
+    'rd2wrt_transcriptor') and are not changed.
+
+    Input:
+        gen_data: list - parameter blocks of the general cfg-file;
+        tab_data: list - parameter blocks of the table cfg-file;
+        cache: dict - default None - fragment cache (see
+            'fragment_cache').
+    Output:
+        stop_id: int - the tab_data list row number, where rendering
+            stoped.
+
+    """
+    env_id, src_systems_count = yield from iter_general_data(gen_data)
+    id = yield from iter_tab_data(tab_data, env_id, cache)
+    return id
+
+def iter_tab_data(tab_data: list, env_id: str, cache: dict = None):
+    """
+    Yields the events of source tables and serving tables of a table
+    cfg-file (the part of the script after adding source-systems).
+
+    Input:
+        tab_data: list - transcribed parameter blocks of the table
+            cfg-file;
+        env_id: str - an identifier of environment where tables will
+            be created;
+        cache: dict - default None - fragment cache (see
+            'fragment_cache').
+    Output:
+        stop_id: int - the tab_data list row number, where rendering
+            stoped.
+
+    """
+    id = yield from iter_src_tables(tab_data, env_id, cache = cache)
+    id = yield from iter_serv_tables(tab_data, env_id, id, cache)
     return id
 
+def iter_prepared(events):
+    """
+    Prepared-statement output mode. Transforms the events: before the
+    first command of each metaload function its shape is prepared
+    (EVENT_PREPARE event), every command is replaced by execution of the
+    prepared statement with the parameter values only. Shapes are
+    never prepared inside a unit of the checkpointed layout: they go
+    before the unit, so they are executed, when the unit is skipped on
+    resume. Fragment events (see 'fragment_event') have no parameters,
+    ValueError is raised on them.
+
+    Input:
+        events - generator of the events.
+    Output:
+        result - the value returned by the input generator.
+
+    """
+    prepared = set()
+    unit_events = None
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as stop:
+            return stop.value
+        if event.kind == EVENT_FRAGMENT:
+            raise ValueError(FRAGMENT_ERROR)
+        if event.kind == EVENT_UNIT_START:
+            unit_events = [event]
+            continue
+        if event.kind == EVENT_STATEMENT:
+            if event.name not in prepared:
+                prepared.add(event.name)
+                yield RenderEvent(EVENT_PREPARE, event.name,
+                                  mtl.prepare_statement(event.name), None)
+            event = event._replace(
+                text = mtl.execute_statement(event.name, event.params)
+            )
+        if unit_events is None:
+            yield event
+        else:
+            unit_events.append(event)
+            if event.kind == EVENT_UNIT_END:
+                yield from unit_events
+                unit_events = None
+
+##############################################################################
+## multi-environment fan-out block ###########################################
+##############################################################################
+
+# the marker is built into the rendered text instead of a real env_id; it
+# must not contain quotes, because table names are generated without them
+ENV_ID_MARKER = '@@env_id@@'
+
+def writedown_env_template(gen_data: list, tab_data: list,
+                           prepared: bool = False, cache: dict = None,
+                           checkpoints: bool = False):
+    """
+    Renders the whole script once with the env_id marker instead of a
+    real environment identifier. The input lists are not changed.
+
+    Input:
+        gen_data: list - transcribed parameter blocks of the general
+            cfg-file;
+        tab_data: list - transcribed parameter blocks of the table
+            cfg-file;
+        prepared: bool - default False - prepared-statement output
+            mode (see 'iter_prepared');
+        cache: dict - default None - fragment cache (see
+            'fragment_cache'), not used in the prepared-statement mode
+            and in the checkpointed layout;
+        checkpoints: bool - default False - checkpointed layout (see
+            'iter_checkpointed_script').
+    Output:
+        template: str - script text with the env_id marker;
+        stop_id: int - the tab_data list row number, where writing
+            stoped; the number of the units in the checkpointed layout.
+
+    """
+    marker = "'" + ENV_ID_MARKER + "'"
+    marked_gen_data = list()
+    for params in gen_data:
+        params = dict(params)
+        if 'env_id' in params:
+            params['env_id'] = marker
+        marked_gen_data.append(params)
+    if checkpoints:
+        events = iter_checkpointed_script(marked_gen_data, tab_data)
+    elif prepared:
+        events = iter_script(marked_gen_data, tab_data)
+    else:
+        events = iter_script(marked_gen_data, tab_data, cache)
+    if prepared:
+        events = iter_prepared(events)
+    return render_events(events)
+
+def env_script(template: str, env_id: str):
+    """
+    Substitutes the environment identifier into the script template.
+
+    Input:
+        template: str - script text with the env_id marker;
+        env_id: str - environment identifier, quoted or not.
+    Output:
+        script: str - script text for the environment.
+
+    """
+    return template.replace(ENV_ID_MARKER, str(env_id).replace("'", ""))
+
+def writedown_env_scripts(gen_data: list, tab_data: list, env_ids: list,
+                          out_path: str, prepared: bool = False,
+                          cache: dict = None, checkpoints: bool = False):
+    """
+    Writes down one script file per environment. The cfg data are
+    rendered once, only the env_id is substituted for each file.
+
+    Input:
+        gen_data: list - transcribed parameter blocks of the general
+            cfg-file;
+        tab_data: list - transcribed parameter blocks of the table
+            cfg-file;
+        env_ids: list - environment identifiers;
+        out_path: str - output file path with the '{env_id}' field,
+            e.g. 'script__{env_id}.sql';
+        prepared: bool - default False - prepared-statement output
+            mode (see 'iter_prepared');
+        cache: dict - default None - fragment cache (see
+            'fragment_cache'), not used in the prepared-statement mode
+            and in the checkpointed layout;
+        checkpoints: bool - default False - checkpointed layout (see
+            'iter_checkpointed_script'), the files can be executed by
+            'mtl_deploy.execute_script_file'.
+    Output:
+        out_files: list - paths of the written files;
+        stop_id: int - the tab_data list row number, where writing
+            stoped; the number of the units in the checkpointed layout.
+
+    """
+    template, id = writedown_env_template(gen_data, tab_data, prepared,
+                                          cache, checkpoints)
+    out_files = list()
+    for env_id in env_ids:
+        env_name = str(env_id).replace("'", "")
+        filepath = out_path.format(env_id = env_name)
+        with open(filepath, 'w') as out_file:
+            out_file.write(env_script(template, env_name))
+        out_files.append(filepath)
+    return out_files, id
+
+##############################################################################
+## external grouping block ###################################################
+##############################################################################
+
+def tab_group_key(params: dict, seq: int):
+    """
+    Returns the sorting key, that groups table parameter blocks in the
+    order expected by the writing functions: source systems first
+    (tables, then columns of each system), serving schemas after them.
+    Inside a group the columns are clustered by tables, the original
+    row order is kept otherwise.
+
+    Input:
+        params: dict - parameter block of a table cfg-file;
+        seq: int - number of the block in the input.
+    Output:
+        key: tuple - sorting key.
+
+    """
+    # CONSTANTS
+    MODE_ORDER = {
+        'src_table': (0, 0),
+        'src_col': (0, 1),
+        'serv_table': (1, 0),
+        'serv_col': (1, 1)
+    }
+    # body
+    section, rank = MODE_ORDER[params['mode']]
+    if section == 0:
+        group = str(params['src_name'])
+    else:
+        group = str(params['schema_name'])
+    if rank == 0:
+        tablename = ''
+    else:
+        tablename = str(params['tablename'])
+    return section, group, rank, tablename, seq
+
+def _spill_run(run: list, tmp_dir: str):
+    """
+    Sorts the run and writes it to a temporary file.
+    Returns the opened file positioned at its start.
+
+    """
+    run.sort(key = lambda item: item[0])
+    run_file = tempfile.TemporaryFile('w+', dir = tmp_dir)
+    for key, line in run:
+        run_file.write(line)
+    run_file.seek(0)
+    return run_file
+
+def _read_run(run_file):
+    """
+    Reads a sorted run back. Yields pairs (key, params).
+
+    """
+    for line in run_file:
+        seq, params = json.loads(line)
+        yield tab_group_key(params, seq), params
+
+def group_tab_data(in_data, memory_budget: int = 64 * 1024 * 1024,
+                   tmp_dir: str = None):
+    """
+    Groups table parameter blocks of any number (see 'tab_group_key').
+    The blocks are collected into runs of limited size; each run is
+    sorted and spilled to a temporary file, then all runs are merged.
+    If the input fits into the budget, nothing is spilled.
+
+    Input:
+        in_data - iterable of parameter blocks (in 'dict' type), e.g.
+            a list or the 'tab_params_stream' generator;
+        memory_budget: int - default 64 MiB - approximate size of one
+            run in bytes (size of the serialized blocks);
+        tmp_dir: str - default None - directory for the temporary
+            files; None - the system default.
+    Output:
+        generator of dicts - grouped parameter blocks.
+
+    """
+    run = list()
+    run_size = 0
+    run_files = list()
+    try:
+        for seq, params in enumerate(in_data):
+            line = json.dumps([seq, params]) + '\n'
+            run.append((tab_group_key(params, seq), line))
+            run_size += len(line)
+            if run_size >= memory_budget:
+                run_files.append(_spill_run(run, tmp_dir))
+                run = list()
+                run_size = 0
+        if not run_files:
+            run.sort(key = lambda item: item[0])
+            for key, line in run:
+                yield json.loads(line)[1]
+            return
+        if run:
+            run_files.append(_spill_run(run, tmp_dir))
+            run = list()
+        runs = [_read_run(run_file) for run_file in run_files]
+        for key, params in heapq.merge(*runs, key = lambda item: item[0]):
+            yield params
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+def iter_tab_stream(in_data, env_id: str, cache: dict = None):
+    """
+    Generator version of 'writedown_tab_stream'. The blocks are
+    rendered one by one, sections are opened and closed, when the
+    'mode' or the group (a source system or a serving schema) changes;
+    the layout is the same as the one of 'iter_script' for grouped
+    blocks. Only the blocks of one fragment (see 'FRAGMENT_BLOCKS') are
+    held in memory, if the fragment cache is given.
+
+    """
+    # CONSTANTS
+    COL_MODES = {'src_table': 'src_col', 'serv_table': 'serv_col'}
+    TABLE_MODES = {'src_col': 'src_table', 'serv_col': 'serv_table'}
+    # body
+    rows_count = 0
+    serv_started = False
+    group = None
+    mode = None
+    block = list()
+    block_key = None
+    for params in itertools.chain(in_data, [None]):
+        if params is not None:
+            row_mode = params['mode']
+            src_flag = row_mode in ('src_table', 'src_col')
+            if src_flag:
+                row_group = (src_flag, params['src_name'])
+            else:
+                row_group = (src_flag, params['schema_name'])
+            row_key = operator.itemgetter(*FRAGMENT_BLOCKS[row_mode])(params)
+        # the fragment of the cached blocks is complete
+        if block and (params is None or row_mode != mode
+                      or row_key != block_key):
+            yield fragment_event(block, env_id, cache)
+            block = list()
+        # a table after columns starts the group again
+        new_group = params is None or row_group != group \
+                    or (row_mode in TABLE_MODES.values()
+                        and mode in COL_MODES.values())
+        if new_group and group is not None:
+            if mode in COL_MODES:
+                yield section_end(ROW_SECTIONS[mode])
+                yield section_start(ROW_SECTIONS[COL_MODES[mode]])
+                yield section_end(ROW_SECTIONS[COL_MODES[mode]])
+            else:
+                yield section_end(ROW_SECTIONS[mode])
+            if group[0]:
+                yield section_end('SOURCE_SYSTEM '
+                                  + group[1].replace("'", ""))
+        if params is None:
+            break
+        if new_group:
+            if src_flag:
+                yield section_start('SOURCE_SYSTEM '
+                                    + row_group[1].replace("'", ""))
+                yield statement_event('set_env', dict(env_id = env_id))
+            elif not serv_started:
+                yield section_start('SERVING_LAYERS')
+                yield statement_event('set_env', dict(env_id = env_id))
+                serv_started = True
+            if row_mode in TABLE_MODES:
+                yield section_start(ROW_SECTIONS[TABLE_MODES[row_mode]])
+                yield section_end(ROW_SECTIONS[TABLE_MODES[row_mode]])
+            yield section_start(ROW_SECTIONS[row_mode])
+            group = row_group
+        elif row_mode != mode:
+            yield section_end(ROW_SECTIONS[mode])
+            yield section_start(ROW_SECTIONS[row_mode])
+        mode = row_mode
+        if cache is None:
+            yield row_statement(params, env_id)
+        else:
+            if not block:
+                block_key = row_key
+            block.append(params)
+        rows_count += 1
+    if not serv_started:
+        yield section_start('SERVING_LAYERS')
+        yield statement_event('set_env', dict(env_id = env_id))
+    yield section_end('SERVING_LAYERS')
+    return rows_count
+
+def iter_stream_script(gen_data: list, in_data, cache: dict = None):
+    """
+    Yields the events of the whole script, the table parameter blocks
+    are taken from the grouped stream (see 'iter_tab_stream').
+
+    Input:
+        gen_data: list - transcribed parameter blocks of the general
+            cfg-file;
+        in_data - iterable of grouped parameter blocks;
+        cache: dict - default None - fragment cache (see
+            'fragment_cache').
+    Output:
+        rows_count: int - number of the rendered parameter blocks.
+
+    """
+    env_id, src_systems_count = yield from iter_general_data(gen_data)
+    rows_count = yield from iter_tab_stream(in_data, env_id, cache)
+    return rows_count
+
+def writedown_tab_stream(in_data, env_id: str):
+    """
+    Writes down command lines that creates source and serving tables
+    from the grouped stream of parameter blocks (see 'group_tab_data').
+    The blocks are not held in memory (see 'iter_tab_stream').
+
+    Input:
+        in_data - iterable of grouped parameter blocks;
+        env_id: str - an identifier of environment where tables will
+            be created.
+    Output:
+        rows_count: int - number of the written parameter blocks.
+
+    """
+    return print_events(iter_tab_stream(in_data, env_id))
+
+##############################################################################
+## catalog-aware generation block ############################################
+##############################################################################
+
+# Bulk catalog queries: objects of the environment, that already exist.
+# The queries are written for the catalog tables of the local stand-in
+# ('mtl_standin.py'); '{p}' is the driver placeholder for the env_id.
+CATALOG_QUERIES = {
+    'f_add_source_system':
+        'select src_name from mtl_source_system where env_id = {p}',
+    'f_add_source_table':
+        'select src_name, src_schema, tablename from mtl_source_table '
+        'where env_id = {p}',
+    'f_add_source_column':
+        'select t.src_name, t.src_schema, t.tablename, c.column_name '
+        'from mtl_source_column c '
+        'join mtl_source_table t on t.tab_id = c.tab_id '
+        'where t.env_id = {p}',
+    'f_add_serving_table':
+        'select schema_name, tablename from mtl_serving_table '
+        'where env_id = {p}',
+    'f_add_serving_column':
+        'select t.schema_name, t.tablename, c.column_name '
+        'from mtl_serving_column c '
+        'join mtl_serving_table t on t.tab_id = c.tab_id '
+        'where t.env_id = {p}'
+}
+
+def catalog_key(func_name: str, params: dict):
+    """
+    Returns the identity key of the object, which is added by the
+    metaload command, in the form of rows of CATALOG_QUERIES.
+
+    Input:
+        func_name: str - name of the metaload function;
+        params: dict - keyword arguments of the function.
+    Output:
+        key: tuple - identity key; None for other commands.
+
+    """
+    def value(item):
+        return str(mtl.sql_value(item))
+
+    if func_name == 'f_add_source_system':
+        return (value(params['src_name']),)
+    elif func_name == 'f_add_source_table' \
+         or func_name == 'f_add_source_column':
+        key = (value(params['src_name']),
+               value(params['src_schema']),
+               value(params['tablename']))
+        if func_name == 'f_add_source_column':
+            key += (value(params['column_name']),)
+        return key
+    elif func_name == 'f_add_serving_table' \
+         or func_name == 'f_add_serving_column':
+        servtablename = mtl.serving_table_name(params['tablename'],
+                                               params['schema_name'])
+        key = (value(params['schema_name']), value(servtablename))
+        if func_name == 'f_add_serving_column':
+            key += (value(params['column_name']),)
+        return key
+
+def prefetch_catalog(connection, env_id: str, placeholder: str = '?',
+                     queries: dict = CATALOG_QUERIES):
+    """
+    Reads the objects of the environment, that already exist, by one
+    bulk query for each kind of objects.
+
+    Input:
+        connection - DB-API connection;
+        env_id: str - environment identifier, quoted or not;
+        placeholder: str - default '?' - driver placeholder ('?' for
+            sqlite3, '%s' for psycopg2);
+        queries: dict - default CATALOG_QUERIES - catalog queries for
+            metaload functions.
+    Output:
+        catalog: dict - sets of identity keys (see 'catalog_key') for
+            metaload function names.
+
+    """
+    catalog = dict()
+    env_value = mtl.sql_value(env_id)
+    cursor = connection.cursor()
+    for func_name, query in queries.items():
+        cursor.execute(query.format(p = placeholder), (env_value,))
+        catalog[func_name] = set(
+            tuple(str(item) for item in row) for row in cursor.fetchall()
+        )
+    cursor.close()
+    return catalog
+
+def iter_missing(events, catalog: dict):
+    """
+    Idempotent generation. Transforms the events: the commands, which
+    add objects that already exist in the catalog, are dropped.
+    Fragment events (see 'fragment_event') have no parameters and can
+    not be checked, ValueError is raised on them.
+
+    Input:
+        events - generator of the events;
+        catalog: dict - sets of identity keys (see 'prefetch_catalog').
+    Output:
+        result - the value returned by the input generator.
+
+    """
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as stop:
+            return stop.value
+        if event.kind == EVENT_FRAGMENT:
+            raise ValueError(FRAGMENT_ERROR)
+        if event.kind == EVENT_STATEMENT and event.name in catalog:
+            if catalog_key(event.name, event.params) in catalog[event.name]:
+                continue
+        yield event
+
+##############################################################################
+## rendered fragment cache block #############################################
+##############################################################################
+
+def fragment_cache(byte_budget: int = 64 * 1024 * 1024,
+                   cache_dir: str = None):
+    """
+    Creates the cache of rendered fragments (command lines of a block
+    of rows, see 'FRAGMENT_BLOCKS').
+    Fragments are kept in memory and evicted in LRU order, when their
+    total size exceeds the budget. If the directory is given, fragments
+    are also written there and are read back on memory misses, so they
+    are reused between runs. The cache can be shared between threads.
+
+    Input:
+        byte_budget: int - default 64 MiB - memory budget in chars of
+            the fragment text;
+        cache_dir: str - default None - directory of the disk cache;
+            None - the cache is kept in memory only.
+    Output:
+        cache: dict - fragment cache.
+
+    """
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok = True)
+    cache = {
+        'entries': collections.OrderedDict(),
+        'size': 0,
+        'budget': byte_budget,
+        'dir': cache_dir,
+        'lock': threading.Lock()
+    }
+    return cache
+
+def fragment_cache_get(cache: dict, key: str):
+    """
+    Returns the cached fragment text or None.
+
+    """
+    with cache['lock']:
+        if key in cache['entries']:
+            cache['entries'].move_to_end(key)
+            return cache['entries'][key]
+    if cache['dir'] is None:
+        return
+    filepath = os.path.join(cache['dir'], key + '.sql')
+    if not os.path.exists(filepath):
+        return
+    with open(filepath) as fragment_file:
+        text = fragment_file.read()
+    fragment_cache_put(cache, key, text, write = False)
+    return text
+
+def fragment_cache_put(cache: dict, key: str, text: str, write: bool = True):
+    """
+    Puts the fragment text to the cache, evicts the least recently used
+    fragments from memory, if the budget is exceeded.
+
+    """
+    with cache['lock']:
+        entries = cache['entries']
+        if key in entries:
+            cache['size'] -= len(entries.pop(key))
+        entries[key] = text
+        cache['size'] += len(text)
+        while cache['size'] > cache['budget'] and len(entries) > 1:
+            old_key, old_text = entries.popitem(last = False)
+            cache['size'] -= len(old_text)
+    if write and cache['dir'] is not None:
+        filepath = os.path.join(cache['dir'], key + '.sql')
+        tmp_filepath = filepath + '.' + str(threading.get_ident()) + '.tmp'
+        with open(tmp_filepath, 'w') as fragment_file:
+            fragment_file.write(text)
+        os.replace(tmp_filepath, filepath)
+
+def table_identity(params: dict):
+    """
+    Returns the identity of the table, which the parameter block of a
+    table cfg-file belongs to.
+
+    """
+    return (params.get('src_name'), params.get('src_schema'),
+            params.get('schema_name'), params['tablename'])
+
+# fragment blocks: table rows are cached per schema, column rows - per
+# table
+FRAGMENT_BLOCKS = {
+    'src_table': ('src_name', 'src_schema'),
+    'src_col': ('src_name', 'src_schema', 'tablename'),
+    'serv_table': ('schema_name',),
+    'serv_col': ('schema_name', 'tablename')
+}
+
+def fragment_key(rows: list, env_id: str):
+    """
+    Returns the cache key of the fragment: the hash of the parameter
+    blocks of the fragment, the env_id and the version of the templates.
+    The blocks are hashed as the joined values in the order of the
+    headers (the headers are hashed once), there is no serialisation.
+
+    """
+    content = [mtl.TEMPLATE_VERSION, str(env_id), '\x1f'.join(rows[0])]
+    for params in rows:
+        content.append('\x1f'.join(map(str, params.values())))
+    return hashlib.sha1('\x1e'.join(content).encode('utf-8')).hexdigest()
+
+def fragment_event(rows: list, env_id: str, cache: dict):
+    """
+    Returns the fragment event with command lines of the parameter
+    blocks of a table; the text is taken from the cache or rendered
+    and put into the cache.
+
+    Input:
+        rows: list - parameter blocks of one fragment block (see
+            'FRAGMENT_BLOCKS') and one 'mode';
+        env_id: str - an identifier of environment where tables will
+            be created;
+        cache: dict - fragment cache (see 'fragment_cache').
+    Output:
+        event: RenderEvent - fragment event.
+
+    """
+    key = fragment_key(rows, env_id)
+    text = fragment_cache_get(cache, key)
+    if text is None:
+        text = '\n'.join([format_event(row_statement(params, env_id))
+                          for params in rows])
+        fragment_cache_put(cache, key, text)
+    return RenderEvent(EVENT_FRAGMENT, rows[0]['mode'], text, None)
+
+##############################################################################
+## multiple table cfg-files block ############################################
+##############################################################################
+
+def tab_cfg_filepaths(filepath_pattern: str, cfg_files_count: int):
+    """
+    Returns the paths of table cfg-files declared in the general
+    cfg-file. The total number of cfg-files includes the general one,
+    table cfg-files are numbered from 1.
+
+    Input:
+        filepath_pattern: str - table cfg-file path with the '{no}'
+            field, e.g. 'csv__cfg_tables_{no}.csv';
+        cfg_files_count: int - total number of configuration files (see
+            'gen_cfg_file_preparation').
+    Output:
+        filepaths: list - table cfg-file paths.
+
+    """
+    return [filepath_pattern.format(no = no)
+            for no in range(1, cfg_files_count)]
+
+def render_tab_cfg_file(filepath: str, headers: dict, env_id: str,
+                        delimiter: str = ';', filters: dict = None):
+    """
+    Parses, transcribes and renders one table cfg-file.
+
+    Input:
+        filepath: str - configuration file path;
+        headers: dict - dictionaries with parameter names for
+            diferent sets;
+        env_id: str - an identifier of environment where tables will
+            be created;
+        delimiter: str - default ';' - string element separator;
+        filters: dict - default None - see 'tab_cfg_file_preparation'.
+    Output:
+        text: str - rendered command lines;
+        stop_id: int - the row number, where rendering stoped;
+        rows_count: int - number of parameter blocks in the file.
+
+    """
+    tab_data = tab_cfg_file_preparation(filepath, headers,
+                                        delimiter = delimiter,
+                                        filters = filters)
+    for i in range(len(tab_data)):
+        tab_data[i] = rd2wrt_transcriptor(tab_data[i])
+    text, id = render_events(iter_tab_data(tab_data, env_id))
+    return text, id, len(tab_data)
+
+def _render_tab_cfg_file_job(job: tuple):
+    """
+    Process pool job: unpacks arguments of 'render_tab_cfg_file'.
+
+    """
+    return render_tab_cfg_file(*job)
+
+def render_tab_cfg_files(filepaths: list, headers: dict, env_id: str,
+                         processes: int = None, delimiter: str = ';',
+                         filters: dict = None):
+    """
+    Parses, transcribes and renders table cfg-files in parallel in a
+    process pool. The results are merged in the order of the files, so
+    the text is the same as the one of serial rendering.
+
+    Input:
+        filepaths: list - table cfg-file paths;
+        headers: dict - dictionaries with parameter names for
+            diferent sets;
+        env_id: str - an identifier of environment where tables will
+            be created;
+        processes: int - default None - number of processes; None - the
+            number of CPUs; 1 - serial rendering without a pool;
+        delimiter: str - default ';' - string element separator;
+        filters: dict - default None - see 'tab_cfg_file_preparation'.
+    Output:
+        results: list - tuples (text, stop_id, rows_count) for each
+            file (see 'render_tab_cfg_file').
+
+    """
+    jobs = [(filepath, headers, env_id, delimiter, filters)
+            for filepath in filepaths]
+    if processes == 1 or len(jobs) < 2:
+        return [_render_tab_cfg_file_job(job) for job in jobs]
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(_render_tab_cfg_file_job, jobs))
+
+##############################################################################
+## dedup block ###############################################################
+##############################################################################
+
+def row_identity(params: dict):
+    """
+    Returns the identity key of the parameter block: the object, which
+    the block adds (environment, source-system, table or column).
+
+    """
+    return (params['mode'],
+            params.get('env_id'),
+            params.get('src_name'),
+            params.get('src_schema', params.get('schema_name')),
+            params.get('tablename'),
+            params.get('column_name'))
+
+def iter_dedup_rows(in_data, seen: dict = None, conflicts: list = None):
+    """
+    Stream version of 'dedup_rows': yields parameter blocks without
+    repeats, conflicting repeated blocks are appended to the list.
+
+    Input:
+        in_data - iterable of parameter blocks (in 'dict' type);
+        seen: dict - default None - see 'dedup_rows';
+        conflicts: list - default None - list for pairs (first block,
+            conflicting block); None - conflicts are not collected.
+    Output:
+        generator of dicts - parameter blocks without repeats.
+
+    """
+    if seen is None:
+        seen = dict()
+    for params in in_data:
+        key = row_identity(params)
+        first = seen.get(key)
+        if first is None:
+            seen[key] = params
+            yield params
+        elif first != params and conflicts is not None:
+            conflicts.append((first, params))
+
+def dedup_rows(in_data: list, seen: dict = None):
+    """
+    Drops repeated parameter blocks: only the first block of each
+    identity key (see 'row_identity') is kept. Repeated blocks, which
+    differ from the first one in other parameters, are returned as
+    conflicts.
+
+    Input:
+        in_data: list - list of parameter blocks (in 'dict' type);
+        seen: dict - default None - first blocks of identity keys from
+            previous calls, it is updated; used to dedup several
+            cfg-files.
+    Output:
+        out_data: list - parameter blocks without repeats;
+        conflicts: list - pairs (first block, conflicting block).
+
+    """
+    conflicts = list()
+    out_data = list(iter_dedup_rows(in_data, seen, conflicts))
+    return out_data, conflicts
+
+def report_conflicts(conflicts: list):
+    """
+    Prints conflicting repeated parameter blocks.
+
+    Input:
+        conflicts: list - pairs (first block, conflicting block).
+
+    """
+    for first, params in conflicts:
+        differences = [key + ': ' + str(first.get(key)) + ' / ' \
+                       + str(params.get(key))
+                       for key in params if first.get(key) != params[key]]
+        print('WARNING: Conflicting duplicate of ' \
+              + str(row_identity(params)) + ' is dropped (' \
+              + '; '.join(differences) + ')')
+
+def _parse_tab_cfg_file_job(job: tuple):
+    """
+    Process pool job: parses and transcribes one table cfg-file.
+
+    """
+    filepath, headers, delimiter, filters = job
+    tab_data = tab_cfg_file_preparation(filepath, headers,
+                                        delimiter = delimiter,
+                                        filters = filters)
+    return [rd2wrt_transcriptor(params) for params in tab_data]
+
+def _render_tab_data_job(job: tuple):
+    """
+    Process pool job: renders parameter blocks of one table cfg-file.
+
+    """
+    tab_data, env_id = job
+    text, id = render_events(iter_tab_data(tab_data, env_id))
+    return text, id, len(tab_data)
+
+def render_dedup_tab_cfg_files(filepaths: list, headers: dict, env_id: str,
+                               processes: int = None, delimiter: str = ';',
+                               seen: dict = None, filters: dict = None):
+    """
+    Version of 'render_tab_cfg_files' with dedup of parameter blocks
+    across all files (see 'dedup_rows'): the files are parsed in
+    parallel, deduped in the order of the files and rendered in
+    parallel.
+
+    Input:
+        filepaths: list - table cfg-file paths;
+        headers: dict - dictionaries with parameter names for
+            diferent sets;
+        env_id: str - an identifier of environment where tables will
+            be created;
+        processes: int - default None - number of processes; None - the
+            number of CPUs; 1 - serial work without a pool;
+        delimiter: str - default ';' - string element separator;
+        seen: dict - default None - see 'dedup_rows';
+        filters: dict - default None - see 'tab_cfg_file_preparation'.
+    Output:
+        results: list - tuples (text, stop_id, rows_count) for each
+            file (see 'render_tab_cfg_file');
+        conflicts: list - pairs (first block, conflicting block).
+
+    """
+    if seen is None:
+        seen = dict()
+    parse_jobs = [(filepath, headers, delimiter, filters)
+                  for filepath in filepaths]
+    if processes == 1 or len(parse_jobs) < 2:
+        tab_data_list = [_parse_tab_cfg_file_job(job) for job in parse_jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            tab_data_list = list(executor.map(_parse_tab_cfg_file_job,
+                                              parse_jobs))
+    conflicts = list()
+    render_jobs = list()
+    for tab_data in tab_data_list:
+        tab_data, file_conflicts = dedup_rows(tab_data, seen)
+        conflicts += file_conflicts
+        render_jobs.append((tab_data, env_id))
+    if processes == 1 or len(render_jobs) < 2:
+        results = [_render_tab_data_job(job) for job in render_jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_render_tab_data_job, render_jobs))
+    return results, conflicts
+
+##############################################################################
+## checkpointed layout block #################################################
+##############################################################################
+
+# text of checkpoint markers, the unit identifier follows them
+CHECKPOINT_BEGIN = '-- CHECKPOINT BEGIN '
+CHECKPOINT_END = '-- CHECKPOINT END '
+
+def unit_id(env_id: str, kind: str, *names):
+    """
+    Returns the stable identifier of a logical unit of the script, e.g.
+    'dev/src_table/crm/public/client'. It depends on the identity of
+    the unit only, so it is the same in every generation.
+
+    Input:
+        env_id: str - environment identifier;
+        kind: str - 'src_sys', 'src_table' or 'serv_table';
+        names - names, which identify the unit.
+    Output:
+        unit_id: str - unit identifier.
+
+    """
+    parts = [env_id, kind] + list(names)
+    return '/'.join([str(mtl.sql_value(part)) for part in parts])
+
+def iter_unit(unit: str, events: list):
+    """
+    Yields the events of the unit between checkpoint markers.
+
+    """
+    yield RenderEvent(EVENT_UNIT_START, unit, CHECKPOINT_BEGIN + unit, None)
+    yield from events
+    yield RenderEvent(EVENT_UNIT_END, unit, CHECKPOINT_END + unit, None)
+
+def _table_units(tab_data: list, modes: tuple, group_key):
+    """
+    Collects parameter blocks of tables and their columns by groups
+    (source-systems) and tables in the order of first appearance.
+
+    """
+    # CONSTANTS
+    COL_MODES = ('src_col', 'serv_col')
+    # body
+    groups = collections.OrderedDict()
+    for params in tab_data:
+        if params['mode'] not in modes:
+            continue
+        tables = groups.setdefault(group_key(params),
+                                   collections.OrderedDict())
+        tables.setdefault(table_identity(params), list()).append(params)
+    # tables go before their columns
+    for tables in groups.values():
+        for table, rows in tables.items():
+            rows.sort(key = lambda params: params['mode'] in COL_MODES)
+    return groups
+
+def iter_checkpointed_script(gen_data: list, tab_data: list):
+    """
+    Yields the events of the whole script in the checkpointed layout:
+    each source-system and each table with its columns is a unit
+    between checkpoint markers. Columns of a table follow the table.
+    Commands that set the environment are outside the units, they are
+    repeated, when a deploy is resumed.
+
+    Input:
+        gen_data: list - transcribed parameter blocks of the general
+            cfg-file;
+        tab_data: list - transcribed parameter blocks of the table
+            cfg-file.
+    Output:
+        units_count: int - number of the units.
+
+    """
+    # Constants
+    START_ID = 1
+    SRC_MODES = ('src_table', 'src_col')
+    SERV_MODES = ('serv_table', 'serv_col')
+    # function body
+    env_id = gen_data[0]['env_id']
+    units_count = 0
+    yield statement_event('set_env',
+                          dict(env_id = gen_data[START_ID]['env_id']))
+    yield section_start('SOURCE_SYSTEMS')
+    for params in gen_data[START_ID:]:
+        event = statement_event('f_add_source_system', dict(
+            env_id = params['env_id'],
+            src_name = params['src_name'],
+            descript = params['descript']
+        ))
+        yield from iter_unit(
+            unit_id(params['env_id'], 'src_sys', params['src_name']),
+            [event]
+        )
+        units_count += 1
+    yield section_end('SOURCE_SYSTEMS')
+    groups = _table_units(tab_data, SRC_MODES,
+                          lambda params: params['src_name'])
+    for src_name, tables in groups.items():
+        system = 'SOURCE_SYSTEM ' + src_name.replace("'", "")
+        yield section_start(system)
+        yield statement_event('set_env', dict(env_id = env_id))
+        for (src_name, src_schema, schema_name, tablename), rows in \
+            tables.items():
+            yield from iter_unit(
+                unit_id(env_id, 'src_table', src_name, src_schema,
+                        tablename),
+                [row_statement(params, env_id) for params in rows]
+            )
+            units_count += 1
+        yield section_end(system)
+    groups = _table_units(tab_data, SERV_MODES, lambda params: None)
+    yield section_start('SERVING_LAYERS')
+    yield statement_event('set_env', dict(env_id = env_id))
+    for tables in groups.values():
+        for (src_name, src_schema, schema_name, tablename), rows in \
+            tables.items():
+            yield from iter_unit(
+                unit_id(env_id, 'serv_table', schema_name, tablename),
+                [row_statement(params, env_id) for params in rows]
+            )
+            units_count += 1
+    yield section_end('SERVING_LAYERS')
+    return units_count
+
+##############################################################################
+## dry-run statistics block ##################################################
+##############################################################################
+
+def _transcribed_len(item):
+    """
+    Returns the length of the item after 'rd2wrt_transcriptor'.
+
+    """
+    if type(item) is not str:
+        return len(str(item))
+    if item.isdigit() or item == 'null':
+        return len(item)
+    return len(item) + 2
+
+def _section_len(name: str):
+    """
+    Returns the length of the start and the end lines of the section.
+
+    """
+    return len(section_start(name).text) + len(section_end(name).text) + 2
+
+def cfg_stats(gen_data: list, tab_data: list, general: bool = True):
+    """
+    Dry-run statistics of the script: counts commands of each metaload
+    function per source-system and schema and estimates the size of
+    the script, without forming the command lines (see
+    'mtl_v1_3.command_len'). The layout of sections is the same as the
+    one of 'iter_script'. Serving tables of invalid schemas are written
+    as error comments and are not counted as commands.
+
+    Input:
+        gen_data: list - parameter blocks of the general cfg-file (not
+            transcribed);
+        tab_data: list - parameter blocks of the table cfg-file (not
+            transcribed);
+        general: bool - default True - count the general block
+            (setting environment and adding source-systems); False -
+            the layout of 'iter_tab_data', for the second and next
+            table cfg-files.
+    Output:
+        report: dict - 'statements': numbers of commands for metaload
+            function names; 'groups': numbers of commands for pairs
+            (function name, group), the group is (src_name,) for
+            source-systems, (src_name, src_schema) for source tables and
+            (schema_name,) for serving tables;
+            'bytes': estimated size of the script; 'unprocessed':
+            number of table parameter blocks, that are out of the
+            layout and would not be written.
+
+    """
+    # CONSTANTS
+    START_ID = 1
+    FUNCS = {
+        'src_sys': 'f_add_source_system',
+        'src_table': 'f_add_source_table',
+        'src_col': 'f_add_source_column',
+        'serv_table': 'f_add_serving_table',
+        'serv_col': 'f_add_serving_column'
+    }
+    SRC_MODES = ('src_table', 'src_col')
+    SERV_MODES = ('serv_table', 'serv_col')
+    # body
+    statements = collections.Counter()
+    groups = collections.Counter()
+    env_len = _transcribed_len(gen_data[0]['env_id'])
+    # an empty line is printed before each command that sets environment
+    set_env_size = mtl.command_len('set_env', {'env_id': env_len}) + 2
+    src_tables_size = sum([_section_len(ROW_SECTIONS[mode])
+                           for mode in SRC_MODES])
+    serv_tables_size = sum([_section_len(ROW_SECTIONS[mode])
+                            for mode in SERV_MODES])
+    size = 0
+
+    def add_row(params):
+        mode = params['mode']
+        lens = dict()
+        for key, value in params.items():
+            lens[key] = _transcribed_len(value)
+        if mode == 'src_sys':
+            group = (params['src_name'],)
+        else:
+            lens['env_id'] = env_len
+            if mode in SRC_MODES:
+                group = (params['src_name'], params['src_schema'])
+            else:
+                group = (params['schema_name'],)
+        if mode == 'serv_table':
+            lens['servtablename'] = mtl.serving_table_name_len(
+                lens['tablename'], "'" + params['schema_name'] + "'")
+            if lens['servtablename'] == None:
+                # the error comment line
+                return len(SCHEMA_ERROR) + lens['schema_name'] + 1
+        groups[(FUNCS[mode], group)] += 1
+        return mtl.command_len(FUNCS[mode], lens) + 1
+
+    # general block
+    if general:
+        statements['set_env'] += 1
+        size += set_env_size + len(section_start('SOURCE_SYSTEMS').text) + 1
+        for params in gen_data[START_ID:]:
+            size += add_row(params)
+    # source systems block
+    N = len(tab_data)
+    id = 0
+    while id < N and tab_data[id]['mode'] in SRC_MODES:
+        statements['set_env'] += 1
+        system = 'SOURCE_SYSTEM ' + tab_data[id]['src_name']
+        size += set_env_size + _section_len(system) + src_tables_size
+        for mode in SRC_MODES:
+            while id < N and tab_data[id]['mode'] == mode:
+                size += add_row(tab_data[id])
+                id += 1
+    # serving layers block
+    statements['set_env'] += 1
+    size += set_env_size + _section_len('SERVING_LAYERS')
+    while id < N and tab_data[id]['mode'] in SERV_MODES:
+        size += serv_tables_size
+        for mode in SERV_MODES:
+            while id < N and tab_data[id]['mode'] == mode:
+                size += add_row(tab_data[id])
+                id += 1
+    for (func_name, group), count in groups.items():
+        statements[func_name] += count
+    report = {
+        'statements': dict(statements),
+        'groups': dict(groups),
+        'bytes': size,
+        'unprocessed': N - id
+    }
+    return report
+
+def merge_stats(reports: list):
+    """
+    Sums dry-run statistics reports (see 'cfg_stats') of several table
+    cfg-files.
+
+    """
+    statements = collections.Counter()
+    groups = collections.Counter()
+    for report in reports:
+        statements.update(report['statements'])
+        groups.update(report['groups'])
+    report = {
+        'statements': dict(statements),
+        'groups': dict(groups),
+        'bytes': sum([report['bytes'] for report in reports]),
+        'unprocessed': sum([report['unprocessed'] for report in reports])
+    }
+    return report
+
+def cfg_files_stats(filepath_gen: str, filepaths_tab: list,
+                    delimiter: str = ';', filters: dict = None):
+    """
+    Reads the general and the table cfg-files and returns dry-run
+    statistics of the script (see 'cfg_stats'); the filters are the
+    same as the ones of partial generation (see 'row_filter').
+
+    Input:
+        filepath_gen: str - general cfg-file path;
+        filepaths_tab: list - table cfg-file paths (see
+            'tab_cfg_filepaths'), or a single path;
+        delimiter: str - default ';' - string element separator;
+        filters: dict - default None - see 'row_filter'.
+    Output:
+        report: dict - see 'cfg_stats'.
+
+    """
+    if type(filepaths_tab) is str:
+        filepaths_tab = [filepaths_tab]
+    gen_data, tab_hdrs, cfg_files_count = gen_cfg_file_preparation(
+        filepath_gen, delimiter = delimiter, filters = filters)
+    reports = list()
+    for i, filepath_tab in enumerate(filepaths_tab):
+        tab_data = tab_cfg_file_preparation(filepath_tab, tab_hdrs,
+                                            delimiter = delimiter,
+                                            filters = filters)
+        reports.append(cfg_stats(gen_data, tab_data, general = i == 0))
+    return merge_stats(reports)
+
+def print_stats(report: dict):
+    """
+    Prints the dry-run statistics report (see 'cfg_stats').
+
+    """
+    print(add_comment('STATEMENTS'))
+    for func_name, count in sorted(report['statements'].items()):
+        print(func_name, count, sep = '\t')
+    print(add_comment('GROUPS'))
+    for (func_name, group), count in sorted(report['groups'].items(),
+                                            key = lambda item: str(item[0])):
+        group_name = '.'.join([str(name) for name in group])
+        print(func_name, group_name, count, sep = '\t')
+    print(add_comment('SIZE'))
+    print('Estimated bytes:', report['bytes'])
+    print('Unprocessed rows:', report['unprocessed'])
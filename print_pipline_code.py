@@ -3,7 +3,10 @@ By using 'pipelines_penman' module the program: read cfg-files from
 directories, which are deterimed by filepaths; extract cfg-file
 content and transform it; print in console commands, which are fully
 ready to move in sql-file as a program body with section separating
-comments.
+comments. If the list of environments is not empty, the script is
+rendered once and written down to a file for each environment instead.
+If the table cfg-file path pattern is given, all table cfg-files
+declared in the general cfg-file are parsed and rendered in parallel.
 
 """
 
@@ -12,19 +15,165 @@ import pipelines_penman as pen
 # cfg-file directory paths
 filepath_gen = 'C:/korus_DAS/training/task/task2.1_(auto-writer)/csv__cfg_general.csv'
 filepath_tab = 'C:/korus_DAS/training/task/task2.1_(auto-writer)/csv__cfg_tables.csv'
+# fan-out: environments to write scripts for (empty - print to console)
+env_ids = []
+filepath_out = 'C:/korus_DAS/training/task/task2.1_(auto-writer)/script__{env_id}.sql'
+# external grouping of table cfg rows: memory budget in bytes
+# (None - the table cfg-file is read as a whole and must be grouped)
+memory_budget = None
+# prepared-statement output mode: each command shape is prepared once
+prepared = False
+# directory of the rendered fragment cache (None - no cache); the cache
+# is not used in the prepared-statement mode
+cache_dir = None
+# table cfg-file path pattern with the '{no}' field for all table
+# cfg-files declared in the general cfg-file (None - the single file
+# 'filepath_tab' is used) and the number of processes to render them;
+# the table cfg-files are written down as plain text to console
+filepath_tab_pattern = None
+processes = None
+# dedup: repeated blocks of the same objects are dropped, conflicting
+# ones are reported
+dedup = False
+# checkpointed layout: units between checkpoint markers for resumable
+# deploys (see 'mtl_deploy.py'); written to files, if 'env_ids' is not
+# empty
+checkpoints = False
+# dry-run: print statistics of the script (numbers of commands and the
+# estimated size) instead of the script itself
+stats_only = False
+# partial generation: filters of cfg rows, e.g. {'src_name': 'erp',
+# 'tablename': 'client_*'} (keys: env_id, src_name, schema_name,
+# tablename - glob pattern; empty - all rows)
+filters = {}
 
-# extracting cfg-files contents
-input_gen_data, tab_hdrs, cfg_fls_count = pen.gen_cfg_file_preparation(filepath_gen)
-for i in range(len(input_gen_data)):
-    input_gen_data[i] = pen.rd2wrt_transcriptor(input_gen_data[i])
-input_tab_data = pen.tab_cfg_file_preparation(filepath_tab,tab_hdrs)
-for i in range(len(input_tab_data)):
-    input_tab_data[i] = pen.rd2wrt_transcriptor(input_tab_data[i])
+if __name__ == '__main__':
+    # the options, which are not supported by the table cfg-file path
+    # pattern and the stream modes
+    if stats_only:
+        unsupported = {}
+    elif filepath_tab_pattern is not None:
+        mode_option = 'filepath_tab_pattern'
+        unsupported = {'prepared': prepared, 'cache_dir': cache_dir,
+                       'env_ids': env_ids, 'checkpoints': checkpoints,
+                       'memory_budget': memory_budget}
+    elif memory_budget is not None:
+        mode_option = 'memory_budget'
+        unsupported = {'env_ids': env_ids, 'checkpoints': checkpoints}
+    else:
+        unsupported = {}
+    unsupported = [name for name, value in unsupported.items()
+                   if value not in (None, False, [])]
+    if unsupported:
+        print('ERROR: Options are not supported with', mode_option + ':',
+              ', '.join(unsupported))
+        raise SystemExit
 
-# writing code to consol
-env_id, src_sys_count = pen.writedown_general_data(input_gen_data)
-id = pen.writedown_src_tables(input_tab_data, env_id)
-id = pen.writedown_serv_tables(input_tab_data, env_id, id)
-# input list end check
-N = len(input_tab_data)
-print('Is work done?    -', id >= N)
+    if cache_dir is not None and not prepared:
+        cache = pen.fragment_cache(cache_dir = cache_dir)
+    else:
+        cache = None
+
+    # extracting cfg-files contents
+    input_gen_data, tab_hdrs, cfg_fls_count = pen.gen_cfg_file_preparation(
+        filepath_gen, filters = filters)
+    if not any(params['mode'] == 'src_sys' for params in input_gen_data):
+        print('ERROR: No source-system rows of the general cfg-file match '
+              'the filters', filters)
+        raise SystemExit
+    if stats_only:
+        if filepath_tab_pattern is not None:
+            filepaths_tab = pen.tab_cfg_filepaths(filepath_tab_pattern,
+                                                  cfg_fls_count)
+        else:
+            filepaths_tab = [filepath_tab]
+        reports = list()
+        for i in range(len(filepaths_tab)):
+            input_tab_data = pen.tab_cfg_file_preparation(
+                filepaths_tab[i], tab_hdrs, filters = filters)
+            reports.append(pen.cfg_stats(input_gen_data, input_tab_data,
+                                         general = i == 0))
+        pen.print_stats(pen.merge_stats(reports))
+        raise SystemExit
+    for i in range(len(input_gen_data)):
+        input_gen_data[i] = pen.rd2wrt_transcriptor(input_gen_data[i])
+    if memory_budget is None and filepath_tab_pattern is None:
+        input_tab_data = pen.tab_cfg_file_preparation(filepath_tab,tab_hdrs,
+                                                      filters = filters)
+        for i in range(len(input_tab_data)):
+            input_tab_data[i] = pen.rd2wrt_transcriptor(input_tab_data[i])
+    if dedup:
+        input_gen_data, conflicts = pen.dedup_rows(input_gen_data)
+        pen.report_conflicts(conflicts)
+        if memory_budget is None and filepath_tab_pattern is None:
+            input_tab_data, conflicts = pen.dedup_rows(input_tab_data)
+            pen.report_conflicts(conflicts)
+
+    if filepath_tab_pattern is not None:
+        # writing code to consol from all table cfg-files
+        gen_text, (env_id, src_sys_count) = pen.render_events(
+            pen.iter_general_data(input_gen_data))
+        print(gen_text, end = '')
+        filepaths_tab = pen.tab_cfg_filepaths(filepath_tab_pattern,
+                                              cfg_fls_count)
+        if dedup:
+            results, conflicts = pen.render_dedup_tab_cfg_files(
+                filepaths_tab, tab_hdrs, env_id, processes,
+                filters = filters)
+            pen.report_conflicts(conflicts)
+        else:
+            results = pen.render_tab_cfg_files(filepaths_tab, tab_hdrs,
+                                               env_id, processes,
+                                               filters = filters)
+        for tab_text, id, N in results:
+            print(tab_text, end = '')
+        print('Is work done?    -', all(id >= N for tab_text, id, N in results))
+    elif memory_budget is not None:
+        # writing code to consol from the grouped stream
+        tab_stream = map(pen.rd2wrt_transcriptor,
+                         pen.tab_params_stream(filepath_tab, tab_hdrs,
+                                               filters = filters))
+        if dedup:
+            tab_conflicts = list()
+            tab_stream = pen.iter_dedup_rows(tab_stream,
+                                             conflicts = tab_conflicts)
+        events = pen.iter_stream_script(
+            input_gen_data, pen.group_tab_data(tab_stream, memory_budget), cache)
+        if prepared:
+            events = pen.iter_prepared(events)
+        rows_count = pen.print_events(events)
+        if dedup:
+            pen.report_conflicts(tab_conflicts)
+        print('Rows written:', rows_count)
+    else:
+        if env_ids:
+            # writing code to files, one for each environment
+            out_files, id = pen.writedown_env_scripts(
+                input_gen_data, input_tab_data, env_ids, filepath_out, prepared,
+                cache, checkpoints)
+            for out_file in out_files:
+                print('Written:', out_file)
+            if checkpoints:
+                print('Units written:', id)
+            else:
+                # input list end check
+                N = len(input_tab_data)
+                print('Is work done?    -', id >= N)
+        elif checkpoints:
+            # writing code to consol in the checkpointed layout
+            events = pen.iter_checkpointed_script(input_gen_data,
+                                                  input_tab_data)
+            if prepared:
+                events = pen.iter_prepared(events)
+            units_count = pen.print_events(events)
+            # a comment, so the output can be executed as a script file
+            print('-- Units written:', units_count)
+        else:
+            # writing code to consol
+            events = pen.iter_script(input_gen_data, input_tab_data, cache)
+            if prepared:
+                events = pen.iter_prepared(events)
+            id = pen.print_events(events)
+            # input list end check
+            N = len(input_tab_data)
+            print('Is work done?    -', id >= N)
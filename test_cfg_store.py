@@ -0,0 +1,63 @@
+"""
+
+Tests of the SQLite store of parsed cfg data (see "cfg_store.py").
+
+"""
+
+import pytest
+import cfg_store
+import pipelines_penman as pen
+
+def stored_tables(connection):
+    return [params['tablename'] for params in
+            cfg_store.query_rows(connection, kind = 'tab', mode = 'src_table')]
+
+def test_import_tab_cfg_without_headers(cfg_files):
+    connection = cfg_store.open_cfg_store(':memory:')
+    with pytest.raises(ValueError):
+        cfg_store.import_tab_cfg(connection, cfg_files[1])
+
+def test_incremental_import(cfg_files, write_cfg):
+    connection = cfg_store.open_cfg_store(':memory:')
+    assert cfg_store.import_gen_cfg(connection, cfg_files[0]) == (3, 0)
+    assert cfg_store.import_tab_cfg(connection, cfg_files[1]) == (11, 0)
+    # unchanged file
+    assert cfg_store.import_tab_cfg(connection, cfg_files[1]) == (0, 0)
+    # an edited row
+    with open(cfg_files[1]) as tab_file:
+        text = tab_file.read()
+    text = text.replace('client;name;text', 'client;name;int')
+    write_cfg('tab_1.csv', text)
+    assert cfg_store.import_tab_cfg(connection, cfg_files[1]) == (1, 1)
+    column = cfg_store.query_rows(connection, mode = 'src_col',
+                                  tablename = 'client')[1]
+    assert (column['column_name'], column['data_type']) == ('name', 'int')
+    # reordered rows are renumbered only
+    lines = text.splitlines(keepends = True)
+    lines[1], lines[2] = lines[2], lines[1]
+    write_cfg('tab_1.csv', ''.join(lines))
+    assert cfg_store.import_tab_cfg(connection, cfg_files[1]) == (0, 0)
+    assert stored_tables(connection) == ['deal', 'client', 'invoice']
+
+def test_filtered_store_script(cfg_files):
+    connection = cfg_store.open_cfg_store(':memory:')
+    cfg_store.import_gen_cfg(connection, cfg_files[0])
+    cfg_store.import_tab_cfg(connection, cfg_files[1])
+    text, id = pen.render_events(cfg_store.iter_store_script(
+        connection, src_name = 'erp'))
+    statements = [line for line in text.splitlines()
+                  if line.startswith('select f_add')]
+    assert statements == [
+        "select f_add_source_system('dev', 'erp', 'Enterprise');",
+        "select f_add_source_table('dev', 'erp', 'invoice', 'sys', 'public', "
+        "'sys__dev__erp__invoice__data');",
+        "select f_add_source_column(f_get_tab_id('dev', 'public', 'invoice', "
+        "'erp'), 'num', 'text', null, null, 'y', 'n', 'n');"
+    ]
+    text, id = pen.render_events(cfg_store.iter_store_script(
+        connection, tablename = 'client*'))
+    assert "'client_t'" in text and "'client_deal_v'" in text
+    assert "'deal'" not in text and "'invoice'" not in text
+    with pytest.raises(ValueError):
+        pen.render_events(cfg_store.iter_store_script(connection,
+                                                      src_name = 'nosuch'))
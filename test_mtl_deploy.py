@@ -0,0 +1,127 @@
+"""
+
+Resume of checkpointed deploys on the sqlite stand-in (see
+"mtl_standin.py").
+
+"""
+
+import sqlite3
+import pytest
+import mtl_deploy
+import mtl_standin
+import pipelines_penman as pen
+
+GEN_DATA = [
+    {'mode': 'env', 'env_id': "'dev'"},
+    {'mode': 'src_sys', 'env_id': "'dev'", 'src_name': "'crm'",
+     'descript': 'null'},
+    {'mode': 'src_sys', 'env_id': "'dev'", 'src_name': "'erp'",
+     'descript': "'Enterprise'"}
+]
+
+def src_table(src_name: str, tablename: str):
+    return {'mode': 'src_table', 'src_name': "'" + src_name + "'",
+            'tablename': "'" + tablename + "'", 'subsystem': "'sys'",
+            'src_schema': "'public'"}
+
+def src_col(src_name: str, tablename: str, column_name: str):
+    return {'mode': 'src_col', 'src_name': "'" + src_name + "'",
+            'src_schema': "'public'", 'tablename': "'" + tablename + "'",
+            'column_name': "'" + column_name + "'", 'data_type': "'int'",
+            'precision': 'null', 'scale': 'null', 'key_flg': "'y'",
+            'batch_flg': "'n'", 'date_prc_flg': "'n'"}
+
+TAB_DATA = [
+    src_table('crm', 'client'),
+    src_table('crm', 'deal'),
+    src_col('crm', 'client', 'id'),
+    src_col('crm', 'deal', 'id'),
+    src_table('erp', 'invoice'),
+    src_col('erp', 'invoice', 'num'),
+    {'mode': 'serv_table', 'schema_name': "'dds_lgc'",
+     'tablename': "'client'", 'key_shifting_type': "'LOCAL'"},
+    {'mode': 'serv_col', 'schema_name': "'dds_lgc'",
+     'tablename': "'client'", 'column_name': "'id'", 'data_type': "'int'",
+     'precision': 'null', 'scale': 'null', 'key_flg': "'y'"}
+]
+
+def catalog_counts(database: str):
+    connection = mtl_standin.connect_standin(database)
+    counts = [connection.execute('select count(*) from ' + table).fetchone()[0]
+              for table in ['mtl_source_system', 'mtl_source_table',
+                            'mtl_source_column', 'mtl_serving_table',
+                            'mtl_serving_column']]
+    connection.close()
+    return counts
+
+@pytest.mark.parametrize('prepared', [False, True])
+def test_resume_script_file(tmp_path, prepared):
+    out_files, units_count = pen.writedown_env_scripts(
+        GEN_DATA, TAB_DATA, ['dev'], str(tmp_path / 'script__{env_id}.sql'),
+        prepared = prepared, checkpoints = True)
+    assert units_count == 6
+    database = str(tmp_path / 'dev.db')
+    # the erp table exists already, so the first run fails on it
+    connection = mtl_standin.connect_standin(database)
+    connection.execute(
+        "insert into mtl_source_table (env_id, src_name, tablename, "
+        "subsystem, src_schema, newtablename) "
+        "values ('dev', 'erp', 'invoice', 'sys', 'public', 'x')")
+    connection.commit()
+    connection.close()
+    connection = mtl_standin.connect_standin(database)
+    with pytest.raises(sqlite3.Error):
+        mtl_deploy.execute_script_file(out_files[0], connection)
+    connection.close()
+    connection = mtl_standin.connect_standin(database)
+    assert len(mtl_deploy.load_journal(connection)) == 4
+    connection.close()
+    connection = mtl_standin.connect_standin(database)
+    connection.execute(
+        "delete from mtl_source_table where newtablename = 'x'")
+    connection.commit()
+    connection.close()
+    # a new connection has no prepared statements of the first run
+    connection = mtl_standin.connect_standin(database)
+    executed, skipped = mtl_deploy.execute_script_file(out_files[0],
+                                                       connection)
+    connection.close()
+    assert (executed, skipped) == (2, 4)
+    assert catalog_counts(database) == [2, 3, 3, 1, 1]
+
+def test_crash_after_commit(tmp_path):
+    out_files, units_count = pen.writedown_env_scripts(
+        GEN_DATA, TAB_DATA, ['dev'], str(tmp_path / 'script__{env_id}.sql'),
+        checkpoints = True)
+    database = str(tmp_path / 'dev.db')
+    connection = mtl_standin.connect_standin(database)
+    commit = connection.commit
+    commits = list()
+
+    def crashing_commit():
+        # the process dies after the third unit is committed
+        commit()
+        commits.append(1)
+        if len(commits) == 4:
+            raise SystemExit
+
+    connection.commit = crashing_commit
+    with pytest.raises(SystemExit):
+        mtl_deploy.execute_script_file(out_files[0], connection)
+    connection.close()
+    connection = mtl_standin.connect_standin(database)
+    executed, skipped = mtl_deploy.execute_script_file(out_files[0],
+                                                       connection)
+    connection.close()
+    assert (executed, skipped) == (3, 3)
+    assert catalog_counts(database) == [2, 3, 3, 1, 1]
+
+def test_script_file_events_skip_totals(tmp_path):
+    filepath = tmp_path / 'script.sql'
+    filepath.write_text(
+        "select f_add_source_system('dev', 'crm', null);\n"
+        "-- Units written: 1\n"
+        "Units written: 1\n"
+        "Is work done?    - True\n")
+    events = list(mtl_deploy.iter_script_file_events(str(filepath)))
+    assert [event.kind for event in events] == [pen.EVENT_STATEMENT]
@@ -0,0 +1,215 @@
+"""
+
+Tests of cfg reading and script rendering (see "pipelines_penman.py").
+The cfg-files are the fixtures of "conftest.py".
+
+"""
+
+import random
+import pytest
+import mtl_standin
+import pipelines_penman as pen
+
+def read_cfg(filepath_gen: str, filepath_tab: str, filters: dict = None):
+    gen_data, tab_hdrs, cfg_files_count = pen.gen_cfg_file_preparation(
+        filepath_gen, filters = filters)
+    tab_data = pen.tab_cfg_file_preparation(filepath_tab, tab_hdrs,
+                                            filters = filters)
+    return ([pen.rd2wrt_transcriptor(params) for params in gen_data],
+            [pen.rd2wrt_transcriptor(params) for params in tab_data])
+
+def shuffled_rows(count: int):
+    rows = list()
+    for src_name in ['crm', 'erp', 'hr']:
+        for no in range(count):
+            tablename = 't' + str(no)
+            rows.append('5;src_table;' + src_name + ';' + tablename
+                        + ';sys;public')
+            for column_name in ['id', 'name', 'value']:
+                rows.append('11;src_col;' + src_name + ';public;' + tablename
+                            + ';' + column_name + ';text;null;null;n;n;n')
+    for schema_name in ['dds_lgc', 'dds_lnk']:
+        for no in range(count):
+            tablename = 's' + str(no)
+            rows.append('4;serv_table;' + schema_name + ';' + tablename
+                        + ';LOCAL')
+            rows.append('8;serv_col;' + schema_name + ';' + tablename
+                        + ';id;int;null;null;y')
+    random.Random(1).shuffle(rows)
+    return '\n'.join(rows) + '\n'
+
+def test_stream_spill_equals_in_memory(cfg_files, write_cfg, monkeypatch):
+    filepath_tab = write_cfg('big.csv', shuffled_rows(100))
+    gen_data, tab_data = read_cfg(cfg_files[0], filepath_tab)
+    expected, id = pen.render_events(pen.iter_script(
+        gen_data, list(pen.group_tab_data(tab_data))))
+    assert id == len(tab_data)
+    spilled_runs = list()
+    spill_run = pen._spill_run
+    monkeypatch.setattr(pen, '_spill_run', lambda run, tmp_dir:
+                        spilled_runs.append(len(run)) or spill_run(run, tmp_dir))
+    gen_data, tab_data = read_cfg(cfg_files[0], filepath_tab)
+    stream = pen.group_tab_data(iter(tab_data), memory_budget = 2000)
+    text, rows_count = pen.render_events(pen.iter_stream_script(gen_data,
+                                                                stream))
+    assert len(spilled_runs) > 10
+    assert rows_count == len(tab_data)
+    assert text == expected
+
+def test_invalid_schema_error_event(cfg_files, capsys):
+    gen_data, tab_data = read_cfg(cfg_files[0], cfg_files[2])
+    events = list(pen.iter_script(gen_data, tab_data))
+    errors = [event for event in events if event.kind == pen.EVENT_ERROR]
+    assert [event.text for event in errors] == \
+           [pen.SCHEMA_ERROR + "'bad_schema'"]
+    assert errors[0].params['tablename'] == "'payment'"
+    text, id = pen.render_events(pen.iter_prepared(
+        pen.iter_script(gen_data, tab_data)))
+    assert capsys.readouterr().out == ''
+
+def test_fragment_events_are_not_transformed(cfg_files):
+    gen_data, tab_data = read_cfg(cfg_files[0], cfg_files[1])
+    cache = pen.fragment_cache()
+    text, id = pen.render_events(pen.iter_script(gen_data, tab_data, cache))
+    assert text == pen.render_events(pen.iter_script(gen_data, tab_data))[0]
+    with pytest.raises(ValueError):
+        pen.render_events(pen.iter_prepared(
+            pen.iter_script(gen_data, tab_data, cache)))
+    with pytest.raises(ValueError):
+        pen.render_events(pen.iter_missing(
+            pen.iter_script(gen_data, tab_data, cache), dict()))
+
+def execute_text(connection, text: str):
+    for line in text.splitlines():
+        if line.startswith('select'):
+            connection.execute(line)
+    connection.commit()
+
+def test_catalog_regeneration_adds_missing_only(cfg_files):
+    gen_data, tab_data = read_cfg(cfg_files[0], cfg_files[1])
+    connection = mtl_standin.connect_standin()
+    # deploy of the crm source system and the dds_lgc schema only
+    deployed = [params for params in tab_data
+                if params.get('src_name') != "'erp'"
+                and params.get('schema_name') != "'dds_lnk'"]
+    text, id = pen.render_events(pen.iter_script(gen_data[:2], deployed))
+    execute_text(connection, text)
+    catalog = pen.prefetch_catalog(connection, "'dev'")
+    text, id = pen.render_events(pen.iter_missing(
+        pen.iter_script(gen_data, tab_data), catalog))
+    added = [line for line in text.splitlines()
+             if line.startswith('select f_add')]
+    assert added == [
+        "select f_add_source_system('dev', 'erp', 'Enterprise');",
+        "select f_add_source_table('dev', 'erp', 'invoice', 'sys', 'public', "
+        "'sys__dev__erp__invoice__data');",
+        "select f_add_source_column(f_get_tab_id('dev', 'public', 'invoice', "
+        "'erp'), 'num', 'text', null, null, 'y', 'n', 'n');",
+        "select f_add_serving_table('dev', 'dds_lnk', 'client_deal_v', "
+        "'GLOBAL');",
+        "select f_add_serving_column(f_get_serving_tab_id('dev', 'dds_lnk', "
+        "'client_deal'), 'client_id', 'int', null, null, 'n');"
+    ]
+    execute_text(connection, text)
+    catalog = pen.prefetch_catalog(connection, "'dev'")
+    text, id = pen.render_events(pen.iter_missing(
+        pen.iter_script(gen_data, tab_data), catalog))
+    assert 'select f_add' not in text
+    # the cached fragments can not be checked against the catalog
+    with pytest.raises(ValueError):
+        pen.render_events(pen.iter_missing(
+            pen.iter_script(gen_data, tab_data, pen.fragment_cache()),
+            catalog))
+
+def test_dedup_across_files(cfg_files, write_cfg, capsys):
+    gen_data, tab_hdrs, cfg_files_count = pen.gen_cfg_file_preparation(
+        cfg_files[0])
+    # an identical duplicate of 'client' and a conflicting one of 'deal'
+    filepath_tab = write_cfg('tab_dup.csv',
+        '5;src_table;crm;client;sys;public\n'
+        '11;src_col;crm;public;client;id;int;null;null;y;n;n\n'
+        '11;src_col;crm;public;deal;id;text;null;null;y;n;n\n'
+        '11;src_col;crm;public;deal;note;text;null;null;n;n;n\n')
+    for processes in [1, 2]:
+        results, conflicts = pen.render_dedup_tab_cfg_files(
+            [cfg_files[1], filepath_tab], tab_hdrs, "'dev'", processes)
+        assert [(id, rows_count) for text, id, rows_count in results] == \
+               [(11, 11), (1, 1)]
+        text = ''.join([text for text, id, rows_count in results])
+        assert text.count("f_add_source_table('dev', 'crm', 'client'") == 1
+        assert "'deal', 'crm'), 'id', 'int'" in text
+        assert "'deal', 'crm'), 'id', 'text'" not in text
+        assert "'note'" in text
+        assert len(conflicts) == 1
+        first, params = conflicts[0]
+        assert (first['data_type'], params['data_type']) == ("'int'", "'text'")
+    pen.report_conflicts(conflicts)
+    out = capsys.readouterr().out
+    assert out.startswith('WARNING: Conflicting duplicate of')
+    assert "data_type: 'int' / 'text'" in out
+
+def test_stats_bytes_equal_rendered_script(cfg_files):
+    report = pen.cfg_files_stats(cfg_files[0], [cfg_files[1], cfg_files[2]])
+    gen_data, tab_data = read_cfg(cfg_files[0], cfg_files[1])
+    text, id = pen.render_events(pen.iter_script(gen_data, tab_data))
+    size = len(text)
+    # the second table cfg-file has a serving table of an invalid schema
+    gen_data, tab_data = read_cfg(cfg_files[0], cfg_files[2])
+    text, id = pen.render_events(pen.iter_tab_data(tab_data,
+                                                   gen_data[0]['env_id']))
+    assert pen.SCHEMA_ERROR + "'bad_schema'" in text
+    size += len(text)
+    assert report['bytes'] == size
+    assert report['unprocessed'] == 0
+    assert report['statements']['f_add_serving_table'] == 3
+
+def row_keys(data: list):
+    return [(params['mode'],
+             params.get('src_name') or params.get('schema_name'),
+             params.get('tablename') or params.get('env_id'))
+            for params in data]
+
+@pytest.mark.parametrize('filters, gen_keys, tab_keys', [
+    # table rows have no environment and are not checked by env_id
+    ({'env_id': 'dev'},
+     [('env', None, 'dev'), ('src_sys', 'crm', 'dev'),
+      ('src_sys', 'erp', 'dev')],
+     None),
+    # serving rows have no src_name and are dropped
+    ({'src_name': 'erp'},
+     [('env', None, 'dev'), ('src_sys', 'erp', 'dev')],
+     [('src_table', 'erp', 'invoice'), ('src_col', 'erp', 'invoice')]),
+    # src_schema of source rows is checked against schema_name
+    ({'schema_name': 'dds_lgc'},
+     None,
+     [('serv_table', 'dds_lgc', 'client'), ('serv_col', 'dds_lgc', 'client')]),
+    ({'schema_name': 'public'},
+     None,
+     [('src_table', 'crm', 'client'), ('src_table', 'crm', 'deal'),
+      ('src_col', 'crm', 'client'), ('src_col', 'crm', 'client'),
+      ('src_col', 'crm', 'deal'), ('src_table', 'erp', 'invoice'),
+      ('src_col', 'erp', 'invoice')]),
+    # tablename is a glob pattern
+    ({'tablename': 'client*'},
+     None,
+     [('src_table', 'crm', 'client'), ('src_col', 'crm', 'client'),
+      ('src_col', 'crm', 'client'), ('serv_table', 'dds_lgc', 'client'),
+      ('serv_table', 'dds_lnk', 'client_deal'),
+      ('serv_col', 'dds_lgc', 'client'),
+      ('serv_col', 'dds_lnk', 'client_deal')]),
+])
+def test_row_filter(cfg_files, filters, gen_keys, tab_keys):
+    gen_data, tab_hdrs, cfg_files_count = pen.gen_cfg_file_preparation(
+        cfg_files[0])
+    tab_data = pen.tab_cfg_file_preparation(cfg_files[1], tab_hdrs)
+    # None - the filter does not check the rows of the reader
+    if gen_keys is None:
+        gen_keys = row_keys(gen_data)
+    if tab_keys is None:
+        tab_keys = row_keys(tab_data)
+    gen_data, tab_hdrs, cfg_files_count = pen.gen_cfg_file_preparation(
+        cfg_files[0], filters = filters)
+    tab_data = pen.tab_cfg_file_preparation(cfg_files[1], tab_hdrs,
+                                            filters = filters)
+    assert row_keys(gen_data) == gen_keys
+    assert row_keys(tab_data) == tab_keys